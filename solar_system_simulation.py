@@ -1,14 +1,40 @@
+import os
 import sys
 import time
 import math
 import random
 import ctypes
+import argparse
+import atexit
+import collections
+import contextlib
+import csv
+import hashlib
+import json
+import queue
+import struct
+import threading
+import zlib
+import multiprocessing
+import concurrent.futures
+from multiprocessing import shared_memory
+import numpy as np
+
+# Headless runs (and benchmarks) render through EGL, which PyOpenGL must select
+# before GL is imported; Mesa's surfaceless platform avoids looking for an
+# X/Wayland display.
+if "--headless" in sys.argv or "--benchmark" in sys.argv:
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+    os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
+from OpenGL.GL.shaders import compileProgram, compileShader
 
 # Global texture storage
-planet_textures = {}
+planet_textures = {}  # name -> base-resolution texture id
+texture_tiers = {}    # name -> {size: texture id} for every LOD tier uploaded
 
 # -----------------------------------------------------------------------------
 # Constants & Configuration
@@ -17,6 +43,123 @@ WINDOW_WIDTH = 1024
 WINDOW_HEIGHT = 768
 WINDOW_TITLE = b"Solar System Simulation - Advanced"
 
+# Procedural texture cache (raw RGB blobs keyed by generator parameters)
+# Bump TEXTURE_CACHE_VERSION whenever a texture generator's output changes.
+TEXTURE_CACHE_ENABLED = True
+TEXTURE_CACHE_VERSION = 1
+TEXTURE_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "solar_system_simulation", "textures")
+TEXTURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Parallel texture generation: worker processes (0 = generate on the main
+# thread) and the row-band height above which one texture is split into
+# several pool tasks.
+TEXTURE_WORKERS = 0
+TEXTURE_BAND_ROWS = 128
+
+# Texture LOD tiers (pixels per side). The first is generated for every body
+# at startup; larger tiers only on demand for camera close-ups.
+TEXTURE_LOD_SIZES = (128, 512, 1024)
+
+# Number of rocks in the asteroid belt (the batched renderer handles 50k+)
+ASTEROID_COUNT = 200
+
+# Number of background stars in the simulation sky
+STAR_COUNT = 1000
+
+# Points kept in each planet's orbit trail (ring buffer capacity)
+TRAIL_LENGTH = 100
+
+# Perspective projection (see reshape); the viewport tracks the window size
+CAMERA_FOV = 45.0
+CAMERA_NEAR = 0.1
+CAMERA_FAR = 300.0
+viewport_size = [WINDOW_WIDTH, WINDOW_HEIGHT]
+
+# View culling ('U' key): planets, the Sun, the spacecraft, labels and belt
+# chunks outside the view frustum or hidden behind the Sun are not drawn.
+# The belt is split into BELT_CULL_CHUNKS angular sectors for this.
+CULLING_ENABLED = True
+BELT_CULL_CHUNKS = 32
+
+# Programmable pipeline: GLSL 1.20 shaders draw the planets, Sun, trails and
+# stars when the driver can compile them; otherwise (or with
+# --fixed-function) everything stays on the fixed-function path.
+SHADERS_ENABLED = True
+
+# Fixed-step simulation clock: physics always advances in SIM_TIMESTEP
+# seconds; frames render an interpolation between the last two steps. After
+# a wall-clock hitch at most MAX_STEPS_PER_FRAME steps are run and the rest is
+# dropped (headless and benchmark frames always run every step they cover).
+SIM_TIMESTEP = 1.0 / 120.0
+MAX_STEPS_PER_FRAME = 8
+
+# Simulated seconds per Earth orbit; '[' and ']' jump the timeline by this much
+EARTH_YEAR = 360.0 / 29.0
+
+# N-body mode ('N' key). Units have G = 1 and a Sun mass that gives Earth its
+# scripted period; planet masses are real fractions of the Sun's. Each
+# physics step is split into leapfrog substeps no longer than NBODY_ETA
+# dynamical times of the body closest to the Sun (up to NBODY_MAX_SUBSTEPS).
+NBODY_SUN_MASS = math.radians(29.0) ** 2 * 10.0 ** 3
+NBODY_PLANET_MASSES = {
+    "Mercury": 1.66e-7, "Venus": 2.45e-6, "Earth": 3.00e-6, "Mars": 3.23e-7,
+    "Jupiter": 9.55e-4, "Saturn": 2.86e-4, "Uranus": 4.37e-5, "Neptune": 5.15e-5,
+}
+NBODY_SOFTENING = 0.05
+NBODY_ETA = 0.05
+NBODY_MAX_SUBSTEPS = 64
+NBODY_ASTEROIDS = True  # Integrate the belt too (as massless test particles)
+
+# Belt self-gravity: each rock's mass in solar masses (0 = test particles).
+# From BARNES_HUT_MIN_BODIES rocks the belt's pull comes from a Barnes-Hut
+# octree; a cell acts as one mass once (cell side + group radius) <
+# BARNES_HUT_THETA * distance. Smaller theta = slower but exact-er.
+NBODY_ASTEROID_MASS = 0.0
+BARNES_HUT_THETA = 0.7
+BARNES_HUT_LEAF_SIZE = 8
+BARNES_HUT_MIN_BODIES = 1000
+# One evaluation of the belt's pull costs about 0.3 s at 10k rocks (4 s at
+# 100k) on one core, so no step runs a whole one: each step evaluates the
+# pull on NBODY_BELT_ROCKS_PER_STEP more rocks against a snapshot of the belt,
+# and the finished field replaces the one in use (double-buffered).
+NBODY_BELT_ROCKS_PER_STEP = 250
+
+# Worker processes that step the N-body asteroid belt in parallel out of
+# shared memory (0 = step everything on the main thread)
+PHYSICS_WORKERS = 0
+
+# Seed for planet start angles, the asteroid belt and the starfield
+# (None = different every run)
+RANDOM_SEED = None
+
+# Frame-time profiler ('P' key): percentiles cover the last PROFILER_WINDOW
+# frames, exports the last PROFILER_HISTORY. GPU time comes from timestamp
+# queries where the driver supports them, issued only while the overlay is
+# shown or --profile-output is recording. 'K' saves to PROFILE_OUTPUT
+# (.csv = one row per frame, .json = samples plus percentiles).
+PROFILER_WINDOW = 240
+PROFILER_HISTORY = 3600
+PROFILER_GPU_TIMERS = True
+PROFILE_OUTPUT = "profile.csv"
+
+# Headless rendering (--headless): simulation steps per second of output and
+# how many captured frames may wait for the disk writer before rendering blocks.
+HEADLESS_FPS = 60
+HEADLESS_FRAMES = 600  # Default frame count when not rendering the tour
+FRAME_QUEUE_SIZE = 8
+
+# Benchmark suite (--benchmark): results are compared with a stored baseline
+# and a metric regresses when it is worse by more than BENCHMARK_TOLERANCE
+# (a fraction: 0.15 = 15% slower / fewer steps per second / more draw calls).
+BENCHMARK_BASELINE = "benchmark_baseline.json"
+BENCHMARK_TOLERANCE = 0.15
+BENCHMARK_FRAMES = 120  # Rendered frames per scene scenario
+BENCHMARK_STEPS = 240   # Physics steps timed per scene scenario
+BENCHMARK_WARMUP_FRAMES = 30  # Untimed frames drawn before timing a scene
+BENCHMARK_RUNS = 3  # Runs per scenario; the median of each metric is kept
+
 # Camera Modes
 CAM_FREE = 0
 CAM_TOP = 1
@@ -208,6 +351,8 @@ class SimulationState:
         # Advanced Features
         self.lighting_enabled = True
         self.gravity_enabled = True
+        self.nbody_enabled = False  # Real gravity instead of scripted orbits
+        self.culling_enabled = CULLING_ENABLED
         self.planets_hidden = False
         
         # Spacecraft controls
@@ -250,17 +395,26 @@ class SimulationState:
         self.sun_selected = True
         
     def toggle_lighting(self):
+        """Switch planet lighting; lit draws pick it up via gl_state.apply_lighting()."""
         self.lighting_enabled = not self.lighting_enabled
-        if self.lighting_enabled:
-            glEnable(GL_LIGHTING)
-            glEnable(GL_LIGHT0)
-        else:
-            glDisable(GL_LIGHTING)
             
+    @property
+    def fixed_lighting(self):
+        """Whether GL_LIGHTING should be on (the shader path lights planets itself)."""
+        return self.lighting_enabled and not shaders.active
+    
     def toggle_gravity(self):
         self.gravity_enabled = not self.gravity_enabled
         print(f"Gravity: {'ON' if self.gravity_enabled else 'OFF'}")
         
+    def toggle_nbody(self):
+        self.nbody_enabled = not self.nbody_enabled
+        print(f"N-Body Gravity: {'ON' if self.nbody_enabled else 'OFF'}")
+        
+    def toggle_culling(self):
+        self.culling_enabled = not self.culling_enabled
+        print(f"View Culling: {'ON' if self.culling_enabled else 'OFF'}")
+        
     def toggle_hide(self):
         self.planets_hidden = not self.planets_hidden
         
@@ -275,209 +429,641 @@ class SimulationState:
 
 state = SimulationState()
 
+# -----------------------------------------------------------------------------
+# GL State Cache
+# -----------------------------------------------------------------------------
+class GLStateCache:
+    """Shadow copy of the capabilities, bindings and blend mode draw code sets.
+    
+    All drawing goes through gl_state instead of calling glEnable,
+    glDisable, glBindTexture, glBlendFunc or glUseProgram directly, so a
+    call that would not change anything is skipped. Helpers state what
+    they need rather than restoring what they changed: GL_LIGHTING in
+    particular is only switched on by draws that are lit (apply_lighting),
+    from SimulationState.lighting_enabled, and everything else just
+    disables it. Counts of issued and elided calls are kept per frame.
+    """
+    def __init__(self):
+        self.caps = {}      # capability -> enabled
+        self.textures = {}  # target -> bound texture
+        self.blend = None   # (src, dst)
+        self.program = None
+        self.issued = 0
+        self.elided = 0
+        self.last_frame = (0, 0)  # (issued, elided) in the previous frame
+    
+    def _changed(self, changed):
+        if changed:
+            self.issued += 1
+        else:
+            self.elided += 1
+        return changed
+    
+    def set(self, cap, enabled):
+        if self._changed(self.caps.get(cap) != enabled):
+            (glEnable if enabled else glDisable)(cap)
+            self.caps[cap] = enabled
+    
+    def enable(self, *caps):
+        for cap in caps:
+            self.set(cap, True)
+    
+    def disable(self, *caps):
+        for cap in caps:
+            self.set(cap, False)
+    
+    def apply_lighting(self):
+        """Fixed-function lighting as the lighting toggle (and shader path) want it."""
+        self.set(GL_LIGHTING, state.fixed_lighting)
+    
+    def bind_texture(self, target, texture):
+        if self._changed(self.textures.get(target) != texture):
+            glBindTexture(target, texture)
+            self.textures[target] = texture
+    
+    def blend_func(self, src, dst):
+        if self._changed(self.blend != (src, dst)):
+            glBlendFunc(src, dst)
+            self.blend = (src, dst)
+    
+    def use_program(self, program):
+        if self._changed(self.program != program):
+            glUseProgram(program)
+            self.program = program
+    
+    def begin_frame(self):
+        """File the counts so far as the last frame's and start counting again."""
+        self.last_frame = (self.issued, self.elided)
+        self.issued = self.elided = 0
+    
+    def report(self):
+        issued, elided = self.last_frame
+        return [f"GL state calls: {issued} issued, {elided} elided"]
+
+gl_state = GLStateCache()
+
 # -----------------------------------------------------------------------------
 # Procedural Texture Generation
 # -----------------------------------------------------------------------------
-def noise2d(x, y, seed=0):
-    """Simple pseudo-random noise function."""
-    n = int(x * 374761393 + y * 668265263 + seed * 1013904223)
+def noise2d_grid(x, y, seed=0):
+    """Pseudo-random noise in [0, 1] over coordinate arrays (an integer hash of x, y and seed)."""
+    # The int64 multiply wraps, but only bits 0..46 of the product reach
+    # the masked result, so the wrap never changes the noise.
+    n = (x * 374761393 + y * 668265263 + seed * 1013904223).astype(np.int64)
     n = (n ^ (n >> 13)) * 1274126177
     return ((n ^ (n >> 16)) & 0x7fffffff) / 0x7fffffff
 
-def fractal_noise(x, y, octaves=4, persistence=0.5, seed=0):
-    """Multi-octave fractal noise."""
+def fractal_noise_grid(x, y, octaves=4, persistence=0.5, seed=0):
+    """Multi-octave fractal noise over coordinate arrays."""
     total = 0.0
     amplitude = 1.0
     frequency = 1.0
     max_value = 0.0
     
     for _ in range(octaves):
-        total += noise2d(x * frequency, y * frequency, seed) * amplitude
+        total = total + noise2d_grid(x * frequency, y * frequency, seed) * amplitude
         max_value += amplitude
         amplitude *= persistence
         frequency *= 2.0
     
     return total / max_value
 
+def texture_grid(size, rows=None):
+    """Return (u, v) texture coordinates as broadcastable row/column arrays.
+    
+    `rows` is an optional (start, stop) band; v then covers only those rows.
+    """
+    start, stop = rows if rows else (0, size)
+    u = (np.arange(size) / size)[np.newaxis, :]
+    v = (np.arange(start, stop) / size)[:, np.newaxis]
+    return u, v
+
+def row_sin(size, scale, rows=None):
+    """Per-row math.sin(v * pi * scale) as a column array.
+    
+    Uses math.sin rather than np.sin so banded planets stay byte-identical
+    to the scalar generators (NumPy's SIMD sin may differ in the last ulp).
+    """
+    start, stop = rows if rows else (0, size)
+    values = [math.sin((y / size) * math.pi * scale) for y in range(start, stop)]
+    return np.array(values)[:, np.newaxis]
+
+def pack_rgb(r, g, b):
+    """Stack integer channel grids into a contiguous (h, w, 3) uint8 buffer."""
+    shape = np.broadcast_shapes(np.shape(r), np.shape(g), np.shape(b))
+    rgb = np.empty(shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = r
+    rgb[..., 1] = g
+    rgb[..., 2] = b
+    return rgb
+
+def mip_chain(pixels):
+    """Yield an RGB image followed by 2x2 box-filtered levels down to 1x1."""
+    level = np.asarray(pixels, dtype=np.uint8)
+    yield level
+    h, w = level.shape[:2]
+    while h > 1 or w > 1:
+        h2, w2 = max(1, h // 2), max(1, w // 2)
+        fh, fw = h // h2, w // w2  # 2, or 1 once an axis is down to a pixel
+        block = level[:h2 * fh, :w2 * fw].reshape(h2, fh, w2, fw, 3).astype(np.uint32)
+        level = ((block.sum(axis=(1, 3)) + fh * fw // 2) // (fh * fw)).astype(np.uint8)
+        h, w = h2, w2
+        yield level
+
 def create_texture(width, height, data):
-    """Create an OpenGL texture from RGB data."""
-    texture_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
+    """Create a mipmapped OpenGL texture from an RGB pixel buffer.
     
-    # Convert to bytes
-    pixels = bytes(data)
+    `data` may be any contiguous buffer of width * height * 3 bytes
+    (a uint8 NumPy array, bytes or a memory map); level 0 is uploaded as-is
+    and the rest of the mip chain is box-filtered from it.
+    """
+    texture_id = glGenTextures(1)
+    gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)  # Small mip levels have odd row sizes
     
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, 
-                 GL_RGB, GL_UNSIGNED_BYTE, pixels)
+    pixels = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    for level, image in enumerate(mip_chain(pixels)):
+        glTexImage2D(GL_TEXTURE_2D, level, GL_RGB, image.shape[1], image.shape[0], 0,
+                     GL_RGB, GL_UNSIGNED_BYTE, image)
     
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
     glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
     
     return texture_id
 
-def generate_sun_texture(size=128):
-    """Generate fiery sun texture."""
-    data = []
-    for y in range(size):
-        for x in range(size):
-            u = x / size
-            v = y / size
-            
-            # Multiple noise layers for turbulence
-            n1 = fractal_noise(u * 8, v * 8, 4, 0.6, 1)
-            n2 = fractal_noise(u * 16, v * 16, 3, 0.5, 2)
-            
-            # Hot spots
-            intensity = 0.7 + n1 * 0.3 + n2 * 0.15
-            
-            r = min(255, int(255 * intensity))
-            g = min(255, int(200 * intensity * (0.8 + n1 * 0.2)))
-            b = min(255, int(50 * n2))
-            
-            data.extend([r, g, b])
+def sun_texture_pixels(size=128, rows=None):
+    """Compute the fiery sun texture as a (size, size, 3) uint8 array."""
+    u, v = texture_grid(size, rows)
+    
+    # Multiple noise layers for turbulence
+    n1 = fractal_noise_grid(u * 8, v * 8, 4, 0.6, 1)
+    n2 = fractal_noise_grid(u * 16, v * 16, 3, 0.5, 2)
+    
+    # Hot spots
+    intensity = 0.7 + n1 * 0.3 + n2 * 0.15
+    
+    r = np.minimum(255, (255 * intensity).astype(np.int64))
+    g = np.minimum(255, (200 * intensity * (0.8 + n1 * 0.2)).astype(np.int64))
+    b = np.minimum(255, (50 * n2).astype(np.int64))
     
-    return create_texture(size, size, data)
+    return pack_rgb(r, g, b)
 
-def generate_planet_texture(name, base_color, size=128):
-    """Generate procedural texture for a planet."""
-    data = []
+def planet_texture_pixels(name, base_color, size=128, rows=None):
+    """Compute a planet's procedural texture as a (size, size, 3) uint8 array."""
+    u, v = texture_grid(size, rows)
     
     # Different patterns for different planets
-    for y in range(size):
-        for x in range(size):
-            u = x / size
-            v = y / size
-            
-            if name == "Mercury":
-                # Gray with craters
-                n = fractal_noise(u * 20, v * 20, 4, 0.6, 10)
-                crater = noise2d(u * 30, v * 30, 20)
-                gray = 0.5 + n * 0.3 - (crater > 0.85) * 0.2
-                r = g = b = int(gray * 200)
-                
-            elif name == "Venus":
-                # Yellowish with swirly clouds
-                n = fractal_noise(u * 6 + v * 2, v * 4, 5, 0.5, 30)
-                r = int(220 * (0.8 + n * 0.2))
-                g = int(180 * (0.7 + n * 0.3))
-                b = int(100 * (0.5 + n * 0.3))
-                
-            elif name == "Earth":
-                # Blue oceans with green/brown continents
-                continent = fractal_noise(u * 8, v * 8, 5, 0.55, 50)
-                is_land = continent > 0.45
-                
-                if is_land:
-                    # Land - green to brown
-                    height = (continent - 0.45) / 0.55
-                    r = int(80 + height * 100)
-                    g = int(120 + height * 40)
-                    b = int(40 + height * 30)
-                else:
-                    # Ocean - blue
-                    depth = 0.45 - continent
-                    r = int(30 + depth * 40)
-                    g = int(80 + depth * 60)
-                    b = int(180 + depth * 50)
-                    
-            elif name == "Mars":
-                # Red/orange with darker regions
-                n1 = fractal_noise(u * 10, v * 10, 4, 0.5, 70)
-                n2 = fractal_noise(u * 20, v * 20, 3, 0.4, 71)
-                
-                r = int(200 * (0.7 + n1 * 0.3))
-                g = int(100 * (0.5 + n1 * 0.3 + n2 * 0.2))
-                b = int(60 * (0.4 + n2 * 0.3))
-                
-            elif name == "Jupiter":
-                # Banded with Great Red Spot feel
-                band = math.sin(v * math.pi * 12) * 0.5 + 0.5
-                n = fractal_noise(u * 15, v * 3, 4, 0.5, 90)
-                turbulence = fractal_noise(u * 8, v * 8, 3, 0.6, 91)
-                
-                mix = band * 0.6 + n * 0.3 + turbulence * 0.1
-                r = int(210 * (0.7 + mix * 0.3))
-                g = int(160 * (0.6 + mix * 0.3))
-                b = int(100 * (0.4 + mix * 0.4))
-                
-            elif name == "Saturn":
-                # Golden banded
-                band = math.sin(v * math.pi * 10) * 0.5 + 0.5
-                n = fractal_noise(u * 12, v * 2, 3, 0.5, 110)
-                
-                mix = band * 0.7 + n * 0.3
-                r = int(230 * (0.75 + mix * 0.25))
-                g = int(200 * (0.7 + mix * 0.25))
-                b = int(130 * (0.5 + mix * 0.3))
-                
-            elif name == "Uranus":
-                # Pale cyan, mostly uniform
-                n = fractal_noise(u * 8, v * 8, 3, 0.3, 130)
-                
-                r = int(150 * (0.85 + n * 0.15))
-                g = int(220 * (0.9 + n * 0.1))
-                b = int(230 * (0.9 + n * 0.1))
-                
-            elif name == "Neptune":
-                # Deep blue with subtle bands
-                band = math.sin(v * math.pi * 6) * 0.3 + 0.7
-                n = fractal_noise(u * 10, v * 10, 3, 0.4, 150)
-                
-                r = int(60 * (0.6 + n * 0.3))
-                g = int(100 * (0.7 + n * 0.2 + band * 0.1))
-                b = int(220 * (0.85 + n * 0.15))
-                
-            else:
-                # Fallback - use base color
-                r = int(base_color[0] * 255)
-                g = int(base_color[1] * 255)
-                b = int(base_color[2] * 255)
-            
-            # Clamp values
-            r = max(0, min(255, r))
-            g = max(0, min(255, g))
-            b = max(0, min(255, b))
-            
-            data.extend([r, g, b])
+    if name == "Mercury":
+        # Gray with craters
+        n = fractal_noise_grid(u * 20, v * 20, 4, 0.6, 10)
+        crater = noise2d_grid(u * 30, v * 30, 20)
+        gray = 0.5 + n * 0.3 - (crater > 0.85) * 0.2
+        r = g = b = (gray * 200).astype(np.int64)
+        
+    elif name == "Venus":
+        # Yellowish with swirly clouds
+        n = fractal_noise_grid(u * 6 + v * 2, v * 4, 5, 0.5, 30)
+        r = (220 * (0.8 + n * 0.2)).astype(np.int64)
+        g = (180 * (0.7 + n * 0.3)).astype(np.int64)
+        b = (100 * (0.5 + n * 0.3)).astype(np.int64)
+        
+    elif name == "Earth":
+        # Blue oceans with green/brown continents
+        continent = fractal_noise_grid(u * 8, v * 8, 5, 0.55, 50)
+        is_land = continent > 0.45
+        
+        # Land - green to brown
+        height = (continent - 0.45) / 0.55
+        # Ocean - blue
+        depth = 0.45 - continent
+        
+        r = np.where(is_land, (80 + height * 100).astype(np.int64),
+                     (30 + depth * 40).astype(np.int64))
+        g = np.where(is_land, (120 + height * 40).astype(np.int64),
+                     (80 + depth * 60).astype(np.int64))
+        b = np.where(is_land, (40 + height * 30).astype(np.int64),
+                     (180 + depth * 50).astype(np.int64))
+        
+    elif name == "Mars":
+        # Red/orange with darker regions
+        n1 = fractal_noise_grid(u * 10, v * 10, 4, 0.5, 70)
+        n2 = fractal_noise_grid(u * 20, v * 20, 3, 0.4, 71)
+        
+        r = (200 * (0.7 + n1 * 0.3)).astype(np.int64)
+        g = (100 * (0.5 + n1 * 0.3 + n2 * 0.2)).astype(np.int64)
+        b = (60 * (0.4 + n2 * 0.3)).astype(np.int64)
+        
+    elif name == "Jupiter":
+        # Banded with Great Red Spot feel
+        band = row_sin(size, 12, rows) * 0.5 + 0.5
+        n = fractal_noise_grid(u * 15, v * 3, 4, 0.5, 90)
+        turbulence = fractal_noise_grid(u * 8, v * 8, 3, 0.6, 91)
+        
+        mix = band * 0.6 + n * 0.3 + turbulence * 0.1
+        r = (210 * (0.7 + mix * 0.3)).astype(np.int64)
+        g = (160 * (0.6 + mix * 0.3)).astype(np.int64)
+        b = (100 * (0.4 + mix * 0.4)).astype(np.int64)
+        
+    elif name == "Saturn":
+        # Golden banded
+        band = row_sin(size, 10, rows) * 0.5 + 0.5
+        n = fractal_noise_grid(u * 12, v * 2, 3, 0.5, 110)
+        
+        mix = band * 0.7 + n * 0.3
+        r = (230 * (0.75 + mix * 0.25)).astype(np.int64)
+        g = (200 * (0.7 + mix * 0.25)).astype(np.int64)
+        b = (130 * (0.5 + mix * 0.3)).astype(np.int64)
+        
+    elif name == "Uranus":
+        # Pale cyan, mostly uniform
+        n = fractal_noise_grid(u * 8, v * 8, 3, 0.3, 130)
+        
+        r = (150 * (0.85 + n * 0.15)).astype(np.int64)
+        g = (220 * (0.9 + n * 0.1)).astype(np.int64)
+        b = (230 * (0.9 + n * 0.1)).astype(np.int64)
+        
+    elif name == "Neptune":
+        # Deep blue with subtle bands
+        band = row_sin(size, 6, rows) * 0.3 + 0.7
+        n = fractal_noise_grid(u * 10, v * 10, 3, 0.4, 150)
+        
+        r = (60 * (0.6 + n * 0.3)).astype(np.int64)
+        g = (100 * (0.7 + n * 0.2 + band * 0.1)).astype(np.int64)
+        b = (220 * (0.85 + n * 0.15)).astype(np.int64)
+        
+    else:
+        # Fallback - use base color
+        shape = (v.shape[0], size)
+        r = np.full(shape, int(base_color[0] * 255))
+        g = np.full(shape, int(base_color[1] * 255))
+        b = np.full(shape, int(base_color[2] * 255))
+    
+    # Clamp values
+    r = np.clip(r, 0, 255)
+    g = np.clip(g, 0, 255)
+    b = np.clip(b, 0, 255)
+    
+    return pack_rgb(r, g, b)
+
+def asteroid_texture_pixels(size=32, rows=None):
+    """Compute the rocky asteroid texture as a (size, size, 3) uint8 array."""
+    u, v = texture_grid(size, rows)
+    
+    n = fractal_noise_grid(u * 10, v * 10, 3, 0.6, 200)
+    gray = (80 + n * 80).astype(np.int64)
     
-    return create_texture(size, size, data)
+    return pack_rgb(gray, (gray * 0.9).astype(np.int64), (gray * 0.85).astype(np.int64))
 
-def generate_asteroid_texture(size=32):
-    """Generate rocky asteroid texture."""
-    data = []
-    for y in range(size):
-        for x in range(size):
-            u = x / size
-            v = y / size
-            
-            n = fractal_noise(u * 10, v * 10, 3, 0.6, 200)
-            gray = int(80 + n * 80)
-            
-            data.extend([gray, int(gray * 0.9), int(gray * 0.85)])
+# Texture table: (texture name, generator kind, base color, size)
+TEXTURE_SPECS = [
+    ("Sun",      "sun",      None,            128),
+    ("Mercury",  "planet",   (0.7, 0.7, 0.7), 128),
+    ("Venus",    "planet",   (0.9, 0.6, 0.2), 128),
+    ("Earth",    "planet",   (0.2, 0.4, 1.0), 128),
+    ("Mars",     "planet",   (1.0, 0.2, 0.2), 128),
+    ("Jupiter",  "planet",   (0.8, 0.6, 0.4), 128),
+    ("Saturn",   "planet",   (0.9, 0.8, 0.5), 128),
+    ("Uranus",   "planet",   (0.4, 0.9, 0.9), 128),
+    ("Neptune",  "planet",   (0.1, 0.1, 0.8), 128),
+    ("Asteroid", "asteroid", None,             32),
+]
+
+def texture_pixels(name, kind, base_color, size, rows=None):
+    """Compute the RGB pixels (optionally one row band) for a TEXTURE_SPECS entry."""
+    if kind == "sun":
+        return sun_texture_pixels(size, rows)
+    elif kind == "asteroid":
+        return asteroid_texture_pixels(size, rows)
+    return planet_texture_pixels(name, base_color, size, rows)
+
+def iter_texture_pixels_parallel(specs, workers):
+    """Generate textures in a process pool, yielding (spec, pixels) as each finishes.
+    
+    Each texture is one pool task, except textures taller than
+    TEXTURE_BAND_ROWS, which are split into row bands and reassembled here.
+    Every band is computed by the same code as serial generation, so the
+    buffers are identical; only the completion order varies.
+    """
+    # Spawn rather than fork: the parent already owns a GL context.
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {}
+        buffers = {}
+        remaining = {}
+        for spec in specs:
+            size = spec[3]
+            bands = [(y, min(y + TEXTURE_BAND_ROWS, size)) for y in range(0, size, TEXTURE_BAND_ROWS)]
+            buffers[spec] = np.empty((size, size, 3), dtype=np.uint8)
+            remaining[spec] = len(bands)
+            for rows in bands:
+                futures[pool.submit(texture_pixels, *spec, rows)] = (spec, rows)
+        
+        for future in concurrent.futures.as_completed(futures):
+            spec, (start, stop) = futures[future]
+            buffers[spec][start:stop] = future.result()
+            remaining[spec] -= 1
+            if remaining[spec] == 0:
+                yield spec, buffers.pop(spec)
+
+class TextureCache:
+    """Persistent store of generated texture pixels.
+    
+    Each texture is a raw RGB blob named by a hash of its generator
+    parameters and TEXTURE_CACHE_VERSION, so a warm start maps the blob
+    straight from disk without evaluating any noise. The directory is kept
+    under max_bytes by evicting the least recently used blobs.
+    """
+    def __init__(self, directory=TEXTURE_CACHE_DIR, max_bytes=TEXTURE_CACHE_MAX_BYTES,
+                 version=TEXTURE_CACHE_VERSION):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"Texture cache disabled ({e})")
+            self.enabled = False
+    
+    def key(self, name, kind, base_color, size):
+        """Content address for a texture: hash of version + generator parameters."""
+        params = repr((self.version, name, kind, base_color, size))
+        return hashlib.sha256(params.encode("utf-8")).hexdigest()
+    
+    def path(self, key):
+        return os.path.join(self.directory, key + ".rgb")
+    
+    def load(self, key, size):
+        """Memory-map a cached blob, or return None if it is missing or truncated."""
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            if os.path.getsize(path) != size * size * 3:
+                return None
+            pixels = np.memmap(path, dtype=np.uint8, mode="r", shape=(size, size, 3))
+            os.utime(path)  # Mark as recently used for eviction
+        except (OSError, ValueError):
+            return None
+        return pixels
+    
+    def store(self, key, pixels):
+        """Write a blob atomically, then trim the cache to max_bytes."""
+        if not self.enabled:
+            return
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(np.ascontiguousarray(pixels, dtype=np.uint8).tobytes())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Texture cache write failed ({e})")
+            return
+        self.evict()
+    
+    def evict(self):
+        """Delete least recently used blobs until the cache fits in max_bytes."""
+        try:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".rgb"):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+    
+    def lookup(self, name, kind, base_color, size):
+        """Return cached pixels for a texture (counting the hit), or None on a miss."""
+        pixels = self.load(self.key(name, kind, base_color, size), size)
+        if pixels is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return pixels
     
-    return create_texture(size, size, data)
+    def save(self, name, kind, base_color, size, pixels):
+        self.store(self.key(name, kind, base_color, size), pixels)
+    
+    def report(self):
+        if not self.enabled:
+            return "Texture cache: disabled"
+        return f"Texture cache: {self.hits} hits, {self.misses} misses ({self.directory})"
+
+def tier_spec(name, size):
+    """TEXTURE_SPECS entry for `name` regenerated at another resolution."""
+    for spec_name, kind, base_color, _ in TEXTURE_SPECS:
+        if spec_name == name:
+            return (name, kind, base_color, size)
+    raise KeyError(name)
+
+def register_texture(spec, pixels):
+    """Upload a texture and record it under its name and resolution tier."""
+    name, kind, base_color, size = spec
+    texture_id = create_texture(size, size, pixels)
+    texture_tiers.setdefault(name, {})[size] = texture_id
+    if spec in TEXTURE_SPECS:
+        planet_textures[name] = texture_id
+    return texture_id
 
-def init_planet_textures():
-    """Initialize all planet textures."""
-    global planet_textures
+def lod_texture(name, pixel_radius):
+    """Pick the texture tier for a body that covers pixel_radius on screen.
+    
+    The front hemisphere shows half the texture width across the body's
+    screen diameter, so a tier is sharp once it has about 4 texels per pixel
+    of radius. Tiers above the base resolution are only generated when the
+    body is the camera's close-up focus; until then the best loaded tier is
+    used. Returns None while the body has no texture at all.
+    """
+    tiers = texture_tiers.get(name)
+    if not tiers:
+        return None
+    
+    wanted = next((size for size in TEXTURE_LOD_SIZES if size >= pixel_radius * 4),
+                  TEXTURE_LOD_SIZES[-1])
+    if wanted > max(tiers) and texture_streamer and name == camera_focus_name(close_up=True):
+        texture_streamer.request(tier_spec(name, wanted))
+    
+    usable = [size for size in tiers if size <= wanted] or [min(tiers)]
+    return tiers[max(usable)]
+
+def init_planet_textures(workers=None):
+    """Initialize all planet textures.
+    
+    With workers > 0 the cache misses are generated in a process pool and
+    this (GLUT) thread only uploads each texture as its pixels arrive.
+    """
+    if workers is None:
+        workers = TEXTURE_WORKERS
     
     print("Generating procedural textures...")
     
-    planet_textures["Sun"] = generate_sun_texture(128)
-    planet_textures["Mercury"] = generate_planet_texture("Mercury", (0.7, 0.7, 0.7), 128)
-    planet_textures["Venus"] = generate_planet_texture("Venus", (0.9, 0.6, 0.2), 128)
-    planet_textures["Earth"] = generate_planet_texture("Earth", (0.2, 0.4, 1.0), 128)
-    planet_textures["Mars"] = generate_planet_texture("Mars", (1.0, 0.2, 0.2), 128)
-    planet_textures["Jupiter"] = generate_planet_texture("Jupiter", (0.8, 0.6, 0.4), 128)
-    planet_textures["Saturn"] = generate_planet_texture("Saturn", (0.9, 0.8, 0.5), 128)
-    planet_textures["Uranus"] = generate_planet_texture("Uranus", (0.4, 0.9, 0.9), 128)
-    planet_textures["Neptune"] = generate_planet_texture("Neptune", (0.1, 0.1, 0.8), 128)
-    planet_textures["Asteroid"] = generate_asteroid_texture(32)
+    cache = TextureCache() if TEXTURE_CACHE_ENABLED else None
+    pending = []
+    for spec in TEXTURE_SPECS:
+        pixels = cache.lookup(*spec) if cache else None
+        if pixels is not None:
+            register_texture(spec, pixels)
+        else:
+            pending.append(spec)
+    
+    if workers > 0 and pending:
+        results = iter_texture_pixels_parallel(pending, workers)
+    else:
+        results = ((spec, texture_pixels(*spec)) for spec in pending)
+    
+    for spec, pixels in results:
+        register_texture(spec, pixels)
+        if cache:
+            cache.save(*spec, pixels)
     
+    if cache:
+        print(f"  {cache.report()}")
     print("Textures generated!")
 
+class TextureStreamer:
+    """Generates textures in the background and swaps them in as they finish.
+    
+    Bodies draw with their flat placeholder color until their name appears
+    in planet_textures, so the window can open before any texture exists.
+    poll() runs on the GLUT thread: it uploads finished textures and starts
+    the next ones in camera-priority order, keeping only a few jobs in flight
+    so the queue can be reordered as the camera moves. Higher LOD tiers are
+    added later through request(). A texture whose job fails is reported
+    and dropped; its body keeps the flat color (or its lower tier).
+    """
+    def __init__(self, specs=TEXTURE_SPECS, workers=None, uploads_per_poll=2):
+        if workers is None:
+            workers = TEXTURE_WORKERS
+        self.pending = set(specs)
+        self.in_flight = {}  # Future -> spec
+        self.requested = set(specs)
+        self.cache = TextureCache() if TEXTURE_CACHE_ENABLED else None
+        self.uploads_per_poll = uploads_per_poll
+        self.max_in_flight = max(1, workers)
+        if workers > 0:
+            ctx = multiprocessing.get_context("spawn")
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.start_time = get_time()
+        self.startup_done = not self.pending
+        if self.pending:
+            print("Generating procedural textures in the background...")
+    
+    @property
+    def done(self):
+        return not self.pending and not self.in_flight
+    
+    def request(self, spec):
+        """Queue a texture (e.g. a higher LOD tier) unless it was requested before."""
+        if spec not in self.requested:
+            self.requested.add(spec)
+            self.pending.add(spec)
+    
+    def _upload(self, spec, pixels, from_cache=False):
+        register_texture(spec, pixels)
+        if self.cache and not from_cache:
+            self.cache.save(*spec, pixels)
+        if self.startup_done:
+            name, _, _, size = spec
+            print(f"Loaded {size}px {name} texture")
+    
+    def poll(self, priority=()):
+        """Upload finished textures and queue more, most important first."""
+        if self.done:
+            return
+        uploads = 0
+        
+        for future in [f for f in self.in_flight if f.done()]:
+            if uploads >= self.uploads_per_poll:
+                break
+            spec = self.in_flight.pop(future)
+            try:
+                pixels = future.result()
+            except Exception as e:
+                name, _, _, size = spec
+                print(f"Texture generation failed for {size}px {name} ({e!r}); keeping the fallback")
+                continue
+            self._upload(spec, pixels)
+            uploads += 1
+        
+        # Most important body first, then smallest tier of that body
+        rank = {name: i for i, name in enumerate(priority)}
+        while self.pending and len(self.in_flight) < self.max_in_flight:
+            if uploads >= self.uploads_per_poll:
+                break
+            spec = min(self.pending, key=lambda sp: (rank.get(sp[0], len(rank)), sp[3], sp[0]))
+            self.pending.remove(spec)
+            pixels = self.cache.lookup(*spec) if self.cache else None
+            if pixels is not None:
+                # Cache hits are cheap to map but still cost an upload
+                self._upload(spec, pixels, from_cache=True)
+                uploads += 1
+            else:
+                self.in_flight[self.executor.submit(texture_pixels, *spec)] = spec
+        
+        if self.done and not self.startup_done:
+            self.startup_done = True
+            if self.cache:
+                print(f"  {self.cache.report()}")
+            print(f"Textures generated! ({get_time() - self.start_time:.2f}s in background)")
+    
+    def finish(self):
+        """Block until every requested texture is uploaded (headless rendering)."""
+        while not self.done:
+            self.poll(texture_priority())
+            if self.in_flight:
+                concurrent.futures.wait(list(self.in_flight),
+                                        return_when=concurrent.futures.FIRST_COMPLETED)
+
+def camera_focus_name(close_up=False):
+    """Name of the body the camera is centred on, or None.
+    
+    The tour stop or followed planet always counts; with close_up=False a
+    selected Sun does too (it is only highlighted, not approached).
+    """
+    if not solar_system:
+        return None
+    if tour_active:
+        return TOUR_STOPS[tour_current_stop]["name"]
+    if state.camera_mode == CAM_FOLLOW and state.selected_planet_index != -1:
+        return solar_system.planets[state.selected_planet_index].name
+    if state.sun_selected and not close_up:
+        return "Sun"
+    return None
+
+def texture_priority():
+    """Texture names ordered by how prominently the camera will show them.
+    
+    The current focus (tour stop, followed planet or selected Sun) comes
+    first, then the remaining bodies by apparent size from the camera eye.
+    """
+    if not solar_system:
+        return [spec[0] for spec in TEXTURE_SPECS]
+    
+    focus = camera_focus_name()
+    camera = solar_system.camera
+    bodies = [("Sun", 2.0, (0.0, 0.0, 0.0))]
+    bodies += [(p.name, p.radius, p.render_pos) for p in solar_system.planets]
+    bodies.sort(key=lambda b: -camera.projected_radius(b[2], b[1]))
+    
+    return ([focus] if focus else []) + [name for name, _, _ in bodies] + ["Asteroid"]
+
 
 # -----------------------------------------------------------------------------
 # Logic / Math Helpers
@@ -485,8 +1071,321 @@ def init_planet_textures():
 def get_time():
     return time.time()
 
-def draw_text(x, y, text):
-    # 2D Overlay Text
+class SimulationClock:
+    """Converts frame times into a whole number of fixed physics steps.
+    
+    advance() adds a frame's duration to an accumulator and returns how many
+    SIM_TIMESTEP steps are now due; alpha is the leftover fraction of a step,
+    used to interpolate the rendered state. Simulated time only moves in
+    whole steps, so feeding the same frame durations reproduces a run
+    exactly. Only tick() (wall-clock time) caps a frame at max_steps; an
+    explicit frame duration always runs every step it covers.
+    """
+    EPSILON = 1e-9  # Absorbs float error so e.g. 1/60 s is exactly two 1/120 s steps
+    
+    def __init__(self, step=SIM_TIMESTEP, max_steps=MAX_STEPS_PER_FRAME):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.steps = 0  # Total steps taken
+        self.last_wall = None
+    
+    @property
+    def time(self):
+        """Simulated seconds elapsed."""
+        return self.steps * self.step
+    
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.step, 1.0)
+    
+    def advance(self, frame_dt, max_steps=None):
+        """Add frame_dt seconds; with max_steps, run at most that many steps."""
+        self.accumulator += frame_dt
+        due = int((self.accumulator + self.EPSILON) // self.step)
+        if max_steps is not None and due > max_steps:
+            # Too far behind (hitch or breakpoint): skip ahead rather than spiral
+            due = max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator = max(self.accumulator - due * self.step, 0.0)
+        self.steps += due
+        return due
+    
+    def tick(self):
+        """advance() by the wall-clock time since the previous tick, capped at max_steps."""
+        now = get_time()
+        frame_dt = 0.0 if self.last_wall is None else now - self.last_wall
+        self.last_wall = now
+        return self.advance(frame_dt, self.max_steps)
+
+# -----------------------------------------------------------------------------
+# Profiling
+# -----------------------------------------------------------------------------
+class Profiler:
+    """Per-frame time spent in named scopes, with rolling percentiles.
+    
+    Work is wrapped in `with profiler.scope(name):`. A scope that runs
+    several times in a frame (e.g. once per physics step) is summed, and
+    end_frame() files the frame's totals in milliseconds. Scopes opened
+    with gpu=True are also bracketed by GL timestamp queries, which are
+    read back frames later so the CPU never waits on the GPU; their times
+    are filed as "gpu:<name>" on the frame that issued them. The queries
+    are only issued while someone will read them: the overlay is visible
+    or record_gpu is set (--profile-output).
+    """
+    SUMMARY_INTERVAL = 0.5  # Seconds between overlay percentile refreshes
+    
+    def __init__(self, window=PROFILER_WINDOW, history=PROFILER_HISTORY):
+        self.window = window
+        self.frames = collections.deque(maxlen=history)  # One {scope: ms} dict per frame
+        self.current = {}
+        self.frame_start = time.perf_counter()
+        self.visible = False
+        self.output = PROFILE_OUTPUT
+        self.record_gpu = False  # Time gpu=True scopes even with the overlay hidden
+        self.gpu = None  # Timestamp query support, probed on first use (needs a context)
+        self.free_queries = []
+        self.pending = []  # (frame totals, name, start query, end query) awaiting the GPU
+        self._summary = []
+        self._summary_time = 0.0
+    
+    @contextlib.contextmanager
+    def scope(self, name, gpu=False):
+        start_query = self._timestamp() if gpu and (self.visible or self.record_gpu) else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] = self.current.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+            if start_query is not None:
+                self.pending.append((self.current, "gpu:" + name, start_query, self._timestamp()))
+    
+    def _timestamp(self):
+        if self.gpu is None:
+            self.gpu = PROFILER_GPU_TIMERS and bool(glQueryCounter) and bool(glGenQueries)
+        if not self.gpu:
+            return None
+        query = self.free_queries.pop() if self.free_queries else int(glGenQueries(1)[0])
+        glQueryCounter(query, GL_TIMESTAMP)
+        return query
+    
+    def _collect_gpu(self):
+        """File finished GPU timings, oldest first, stopping at the first still in flight."""
+        result = ctypes.c_uint64()
+        done = 0
+        for frame, name, start_query, end_query in self.pending:
+            if not glGetQueryObjectiv(end_query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            glGetQueryObjectui64v(start_query, GL_QUERY_RESULT, ctypes.byref(result))
+            start = result.value
+            glGetQueryObjectui64v(end_query, GL_QUERY_RESULT, ctypes.byref(result))
+            frame[name] = frame.get(name, 0.0) + (result.value - start) / 1e6
+            self.free_queries += (start_query, end_query)
+            done += 1
+        del self.pending[:done]
+    
+    def end_frame(self):
+        """Close the frame: its wall time since the last end_frame() is filed as "frame"."""
+        now = time.perf_counter()
+        self.current["frame"] = (now - self.frame_start) * 1000.0
+        self.frame_start = now
+        self.frames.append(self.current)
+        self.current = {}
+        if self.pending:
+            self._collect_gpu()
+    
+    def scope_names(self, frames):
+        """Every scope seen in frames: "frame" first, then alphabetical (children follow parents)."""
+        names = set()
+        for frame in frames:
+            names.update(frame)
+        names.discard("frame")
+        return ["frame"] + sorted(names) if frames else []
+    
+    def percentiles(self, frames=None):
+        """[(scope, p50, p95, p99)] in ms over the given frames (default: the last window)."""
+        if frames is None:
+            frames = list(self.frames)[-self.window:]
+        rows = []
+        for name in self.scope_names(frames):
+            samples = [frame[name] for frame in frames if name in frame]
+            rows.append((name, *np.percentile(samples, (50, 95, 99))))
+        return rows
+    
+    def toggle(self):
+        self.visible = not self.visible
+        print(f"Profiler: {'ON' if self.visible else 'OFF'}")
+    
+    def draw_overlay(self, notes=()):
+        """Draw the percentile table (bottom right), with extra note lines under it."""
+        now = time.perf_counter()
+        if now - self._summary_time > self.SUMMARY_INTERVAL:
+            self._summary = self.percentiles()
+            self._summary_time = now
+        
+        hud = TextBatch()
+        x = WINDOW_WIDTH - 360
+        y = 20 + 16 * (len(self._summary) + len(notes))
+        hud.add(x, y, f"{'ms':<20}{'p50':>8}{'p95':>8}{'p99':>8}", color=(1.0, 1.0, 0.4))
+        for name, p50, p95, p99 in self._summary:
+            y -= 16
+            color = (0.6, 0.9, 1.0) if name.startswith("gpu:") else (1.0, 1.0, 1.0)
+            hud.add(x, y, f"{name[:20]:<20}{p50:8.2f}{p95:8.2f}{p99:8.2f}", color=color)
+        for note in notes:
+            y -= 16
+            hud.add(x, y, note, color=(0.6, 1.0, 0.6))
+        hud.flush()
+    
+    def export(self, path=None):
+        """Write the recorded frames to path: CSV (one row per frame) or JSON."""
+        path = path or self.output
+        frames = list(self.frames)
+        names = self.scope_names(frames)
+        if path.lower().endswith(".json"):
+            data = {
+                "frames": len(frames),
+                "percentiles": {name: {"p50": p50, "p95": p95, "p99": p99}
+                                for name, p50, p95, p99 in self.percentiles(frames)},
+                "samples": {name: [frame.get(name) for frame in frames] for name in names},
+            }
+            with open(path, "w") as f:
+                json.dump(data, f, indent=1)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["index"] + names)
+                for i, frame in enumerate(frames):
+                    writer.writerow([i] + [f"{frame[name]:.4f}" if name in frame else "" for name in names])
+        print(f"Saved {len(frames)} profiled frames to {path}")
+
+profiler = Profiler()
+
+# -----------------------------------------------------------------------------
+# Text Rendering
+# -----------------------------------------------------------------------------
+# GLUT fonts by name: (font, is_stroke_font, freeglut's table for it)
+FONTS = {
+    "fixed": (GLUT_BITMAP_9_BY_15, False, "fgFontFixed9x15"),
+    "times": (GLUT_BITMAP_TIMES_ROMAN_24, False, "fgFontTimesRoman24"),
+    "times_small": (GLUT_BITMAP_TIMES_ROMAN_10, False, "fgFontTimesRoman10"),
+    "stroke": (GLUT_STROKE_ROMAN, True, "fgStrokeRoman"),
+}
+
+# freeglut's font tables, as laid out in its fg_internal.h. GLUT's glyph
+# calls refuse to run before glutInit, which needs a window system, so
+# headless contexts read the glyphs from these tables instead.
+class _BitmapFont(ctypes.Structure):
+    _fields_ = [("name", ctypes.c_char_p), ("quantity", ctypes.c_int), ("height", ctypes.c_int),
+                ("characters", ctypes.POINTER(ctypes.POINTER(ctypes.c_ubyte))),
+                ("xorig", ctypes.c_float), ("yorig", ctypes.c_float)]
+
+class _StrokeVertex(ctypes.Structure):
+    _fields_ = [("x", ctypes.c_float), ("y", ctypes.c_float)]
+
+class _StrokeStrip(ctypes.Structure):
+    _fields_ = [("number", ctypes.c_int), ("vertices", ctypes.POINTER(_StrokeVertex))]
+
+class _StrokeChar(ctypes.Structure):
+    _fields_ = [("right", ctypes.c_float), ("number", ctypes.c_int), ("strips", ctypes.POINTER(_StrokeStrip))]
+
+class _StrokeFont(ctypes.Structure):
+    _fields_ = [("name", ctypes.c_char_p), ("quantity", ctypes.c_int), ("height", ctypes.c_float),
+                ("characters", ctypes.POINTER(ctypes.POINTER(_StrokeChar)))]
+
+def freeglut_glyph_drawer(table, stroke):
+    """A draw_char(font, code) that issues what glutBitmapCharacter/glutStrokeCharacter would.
+    
+    Reads freeglut's own glyph table, so it works without glutInit.
+    Raises ValueError when the GLUT library is not freeglut.
+    """
+    from OpenGL import platform
+    if stroke:
+        font = _StrokeFont.in_dll(platform.PLATFORM.GLUT, table)
+        def draw_char(_, code):
+            glyph = font.characters[code] if code < font.quantity else None
+            if not glyph:
+                return
+            glyph = glyph.contents
+            for strip in glyph.strips[:glyph.number]:
+                glBegin(GL_LINE_STRIP)
+                for vertex in strip.vertices[:strip.number]:
+                    glVertex2f(vertex.x, vertex.y)
+                glEnd()
+            glTranslatef(glyph.right, 0.0, 0.0)
+    else:
+        font = _BitmapFont.in_dll(platform.PLATFORM.GLUT, table)
+        def draw_char(_, code):
+            face = font.characters[code] if 0 < code < font.quantity else None
+            if not face:
+                return
+            width = face[0]
+            bitmap = ctypes.string_at(ctypes.addressof(face.contents) + 1, font.height * ((width + 7) // 8))
+            glBitmap(width, font.height, font.xorig, font.yorig, float(width), 0.0, bitmap)
+    return draw_char
+
+class GlyphCache:
+    """Per-font glyph display lists plus a cache of encoded strings.
+    
+    Each font's 256 Latin-1 glyphs are compiled into consecutive display
+    lists the first time the font is used; a string is then drawn with a
+    single glCallLists over its cached byte encoding instead of one GLUT
+    call per character. Bitmap glyphs advance the raster position and
+    stroke glyphs translate the modelview, exactly as the GLUT calls do.
+    """
+    MAX_STRINGS = 1024
+    
+    def __init__(self):
+        self.bases = {}    # font name -> first display list
+        self.strings = {}  # text -> Latin-1 bytes
+        self.enabled = True  # --no-text turns this off
+        self.glut = True  # False without glutInit (headless): glyphs come from freeglut's tables
+    
+    def base(self, font_name):
+        base = self.bases.get(font_name)
+        if base is None:
+            font, stroke, table = FONTS[font_name]
+            if self.glut:
+                draw_char = glutStrokeCharacter if stroke else glutBitmapCharacter
+            else:
+                try:
+                    draw_char = freeglut_glyph_drawer(table, stroke)
+                except (ValueError, AttributeError) as e:
+                    print(f"Text disabled: no GLUT glyphs without a window ({e})")
+                    self.enabled = False
+                    return None
+            base = glGenLists(256)
+            # Bitmap data is copied into the lists with freeglut's unpacking
+            glPushClientAttrib(GL_CLIENT_PIXEL_STORE_BIT)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            for code in range(256):
+                glNewList(base + code, GL_COMPILE)
+                draw_char(font, code)
+                glEndList()
+            glPopClientAttrib()
+            self.bases[font_name] = base
+        return base
+    
+    def encode(self, text):
+        data = self.strings.get(text)
+        if data is None:
+            if len(self.strings) >= self.MAX_STRINGS:
+                self.strings.clear()
+            data = self.strings[text] = text.encode("latin-1", "replace")
+        return data
+    
+    def draw(self, font_name, text):
+        """Draw text at the current raster position / modelview origin."""
+        data = self.encode(text) if self.enabled else b""
+        base = self.base(font_name) if data else None
+        if base is not None:
+            glListBase(base)
+            glCallLists(len(data), GL_UNSIGNED_BYTE, data)
+
+glyph_cache = GlyphCache()
+
+def begin_overlay():
+    """Switch to a window-sized 2D ortho pass with lighting and depth off."""
     glMatrixMode(GL_PROJECTION)
     glPushMatrix()
     glLoadIdentity()
@@ -495,73 +1394,58 @@ def draw_text(x, y, text):
     glPushMatrix()
     glLoadIdentity()
     
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
-    glColor3f(1.0, 1.0, 1.0)
+    gl_state.disable(GL_LIGHTING)
+    gl_state.disable(GL_DEPTH_TEST)
+
+def end_overlay():
+    gl_state.enable(GL_DEPTH_TEST)
     
-    glRasterPos2i(x, y)
-    for char in text:
-        glutBitmapCharacter(GLUT_BITMAP_9_BY_15, ord(char))
-        
-    glEnable(GL_DEPTH_TEST)
-    if state.lighting_enabled:
-        glEnable(GL_LIGHTING)
-        
     glPopMatrix()
     glMatrixMode(GL_PROJECTION)
     glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
 
-def draw_times_text(x, y, text, large=True):
-    """Draw text using Times Roman font - elegant serif style."""
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT)
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
+class TextBatch:
+    """Collects a frame's overlay text and draws it in one ortho pass."""
+    def __init__(self):
+        self.items = []
     
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
+    def add(self, x, y, text, color=(1.0, 1.0, 1.0), font="fixed"):
+        self.items.append((x, y, text, color, font))
     
+    def flush(self):
+        if not self.items:
+            return
+        begin_overlay()
+        for x, y, text, color, font in self.items:
+            glColor3f(*color)
+            glRasterPos2i(x, y)
+            glyph_cache.draw(font, text)
+        end_overlay()
+        self.items = []
+
+def draw_text(x, y, text):
+    # 2D Overlay Text
+    begin_overlay()
+    glColor3f(1.0, 1.0, 1.0)
     glRasterPos2i(x, y)
-    font = GLUT_BITMAP_TIMES_ROMAN_24 if large else GLUT_BITMAP_TIMES_ROMAN_10
-    for char in text:
-        glutBitmapCharacter(font, ord(char))
-    
-    glEnable(GL_DEPTH_TEST)
-    
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
+    glyph_cache.draw("fixed", text)
+    end_overlay()
+
+def draw_times_text(x, y, text, large=True):
+    """Draw text using Times Roman font - elegant serif style."""
+    begin_overlay()
+    glRasterPos2i(x, y)
+    glyph_cache.draw("times" if large else "times_small", text)
+    end_overlay()
 
 def draw_large_text(x, y, text, scale=0.15):
     """Draw larger text using stroke characters."""
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT)
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-    
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
-    
+    begin_overlay()
     glTranslatef(x, y, 0)
     glScalef(scale, scale, scale)
-    
-    for char in text:
-        glutStrokeCharacter(GLUT_STROKE_ROMAN, ord(char))
-    
-    glEnable(GL_DEPTH_TEST)
-    
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
+    glyph_cache.draw("stroke", text)
+    end_overlay()
 
 def init_background_animation():
     """Initialize background animation elements."""
@@ -638,10 +1522,10 @@ def draw_background_animation():
     glPushMatrix()
     glLoadIdentity()
     
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
-    glEnable(GL_BLEND)
-    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    gl_state.disable(GL_LIGHTING)
+    gl_state.disable(GL_DEPTH_TEST)
+    gl_state.enable(GL_BLEND)
+    gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
     
     for star in shooting_stars:
         alpha = star['life'] / star['max_life']
@@ -656,8 +1540,8 @@ def draw_background_animation():
         glVertex2f(trail_x, trail_y)
         glEnd()
     
-    glDisable(GL_BLEND)
-    glEnable(GL_DEPTH_TEST)
+    gl_state.disable(GL_BLEND)
+    gl_state.enable(GL_DEPTH_TEST)
     
     glPopMatrix()
     glMatrixMode(GL_PROJECTION)
@@ -674,7 +1558,7 @@ def draw_background_animation():
     glLoadIdentity()
     glTranslatef(0, 0, -40)  # Move back to see planets
     
-    glDisable(GL_LIGHTING)
+    gl_state.disable(GL_LIGHTING)
     
     for planet in bg_planets:
         rad = math.radians(planet['angle'])
@@ -685,7 +1569,7 @@ def draw_background_animation():
         glPushMatrix()
         glTranslatef(px, py, pz)
         glColor3f(*planet['color'])
-        glutSolidSphere(planet['size'], 12, 12)
+        mesh_cache.draw_sphere(planet['size'], 12, 12)
         glPopMatrix()
     
     glPopMatrix()
@@ -750,16 +1634,12 @@ def draw_home_screen():
     draw_times_text(WINDOW_WIDTH // 2 - 140, WINDOW_HEIGHT - 160, title, large=True)
     
     # Draw decorative scanline effect (subtle)
-    glDisable(GL_LIGHTING)
-    glEnable(GL_BLEND)
-    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    gl_state.disable(GL_LIGHTING)
+    gl_state.enable(GL_BLEND)
+    gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
     glColor4f(0.0, 0.0, 0.0, 0.04)
-    glBegin(GL_LINES)
-    for scan_y in range(0, WINDOW_HEIGHT, 3):
-        glVertex2f(0, scan_y)
-        glVertex2f(WINDOW_WIDTH, scan_y)
-    glEnd()
-    glDisable(GL_BLEND)
+    geometry_registry.get("scanlines", (WINDOW_WIDTH, WINDOW_HEIGHT), scanline_geometry).draw()
+    gl_state.disable(GL_BLEND)
     
     # Draw decorative line under title
     glColor3f(0.4 + 0.2 * pulse, 0.5 + 0.2 * pulse, 0.8)
@@ -820,7 +1700,7 @@ def draw_tutorial_screen():
     draw_large_text(WINDOW_WIDTH // 2 - 120, WINDOW_HEIGHT - 80, "CONTROLS", 0.22)
     
     # Decorative line
-    glDisable(GL_LIGHTING)
+    gl_state.disable(GL_LIGHTING)
     glColor3f(0.4, 0.5, 0.7)
     glBegin(GL_LINES)
     glVertex2f(100, WINDOW_HEIGHT - 110)
@@ -885,10 +1765,13 @@ def draw_tutorial_screen():
         ("SPACE", "Pause / Resume simulation"),
         ("+ / -", "Speed up / slow down time"),
         ("F", "Fast forward (5x speed)"),
+        ("[ / ]", "Jump back / ahead one Earth year"),
         ("G", "Toggle gravity ON/OFF (planets drift!)"),
+        ("N", "Toggle N-body gravity (real physics)"),
         ("O", "Toggle orbit path lines"),
         ("L", "Toggle lighting effects"),
         ("H", "Hide / Show planets"),
+        ("P / K", "Frame-time profiler / save it to a file"),
         ("ESC", "Exit simulation"),
     ]
     
@@ -932,7 +1815,7 @@ def draw_settings_screen():
     draw_large_text(WINDOW_WIDTH // 2 - 110, WINDOW_HEIGHT - 80, "SETTINGS", 0.22)
     
     # Decorative line
-    glDisable(GL_LIGHTING)
+    gl_state.disable(GL_LIGHTING)
     glColor3f(0.4, 0.5, 0.7)
     glBegin(GL_LINES)
     glVertex2f(100, WINDOW_HEIGHT - 110)
@@ -987,14 +1870,8 @@ def start_simulation():
     state.camera_mode = settings["starting_camera"]
     state.speed_multiplier = settings["starting_speed"]
     state.show_orbits = settings["show_orbits_default"]
-    state.lighting_enabled = settings["lighting_default"]
-    
-    # Apply lighting setting
-    if state.lighting_enabled:
-        glEnable(GL_LIGHTING)
-        glEnable(GL_LIGHT0)
-    else:
-        glDisable(GL_LIGHTING)
+    if state.lighting_enabled != settings["lighting_default"]:
+        state.toggle_lighting()
     
     # Switch to simulation screen
     current_screen = SCREEN_SIMULATION
@@ -1033,7 +1910,7 @@ def get_tour_camera_position(stop_index):
     else:
         # Get planet position and offset camera
         planet = solar_system.planets[stop["index"]]
-        px, py, pz = planet.world_pos
+        px, py, pz = planet.render_pos
         return [px + dist, py + dist * 0.4, pz + dist]
 
 def get_tour_target_position(stop_index):
@@ -1044,7 +1921,7 @@ def get_tour_target_position(stop_index):
         return [0, 0, 0]
     else:
         planet = solar_system.planets[stop["index"]]
-        return list(planet.world_pos)
+        return list(planet.render_pos)
 
 def lerp(a, b, t):
     """Linear interpolation between two values."""
@@ -1091,7 +1968,10 @@ def update_tour(dt):
             tour_camera_start = list(tour_camera_end)
             tour_camera_end = get_tour_camera_position(tour_current_stop)
     
-    # Update camera position
+    aim_tour_camera()
+
+def aim_tour_camera():
+    """Point the camera along the current tour flight path."""
     if solar_system:
         t = smooth_step(tour_transition_progress)
         
@@ -1121,10 +2001,10 @@ def draw_tour_ui():
     stop = TOUR_STOPS[tour_current_stop]
     
     # Draw semi-transparent overlay at bottom
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
-    glEnable(GL_BLEND)
-    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    gl_state.disable(GL_LIGHTING)
+    gl_state.disable(GL_DEPTH_TEST)
+    gl_state.enable(GL_BLEND)
+    gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
     
     # Background panel
     glColor4f(0.0, 0.0, 0.1, 0.7)
@@ -1146,8 +2026,8 @@ def draw_tour_ui():
     glEnd()
     glLineWidth(1.0)
     
-    glDisable(GL_BLEND)
-    glEnable(GL_DEPTH_TEST)
+    gl_state.disable(GL_BLEND)
+    gl_state.enable(GL_DEPTH_TEST)
     
     # Planet name header
     glColor3f(1.0, 0.9, 0.4)
@@ -1174,113 +2054,1481 @@ def draw_tour_ui():
     draw_text(WINDOW_WIDTH // 2 - 150, WINDOW_HEIGHT - 30, "Press SPACE to skip | ESC to exit tour")
 
 # -----------------------------------------------------------------------------
-# Classes
+# Mesh Cache
 # -----------------------------------------------------------------------------
+# Planet and Sun mesh levels by on-screen radius: (max pixel radius, slices,
+# stacks), with enough slices to keep the silhouette within about half a
+# pixel. Bodies switch level only LOD_HYSTERESIS past a limit, and ones
+# under SPRITE_PIXEL_RADIUS (planets, or whole belt sectors) become points.
+SPHERE_LOD_LEVELS = [(6, 10, 8), (20, 16, 12), (60, 24, 18), (160, 40, 30),
+                     (400, 64, 48), (math.inf, 96, 72)]
+LOD_HYSTERESIS = 0.2
+SPRITE_PIXEL_RADIUS = 1.0
 
-class Starfield:
-    def __init__(self, count=1000):
-        self.stars = []
-        for _ in range(count):
-            x = random.uniform(-100, 100)
-            y = random.uniform(-50, 50)
-            z = random.uniform(-100, 100)
-            brightness = random.uniform(0.3, 1.0)  # Initial brightness
-            twinkle_speed = random.uniform(0.5, 3.0)  # How fast it twinkles
-            twinkle_offset = random.uniform(0, 6.28)  # Random phase offset
-            self.stars.append({
-                'pos': (x, y, z),
-                'brightness': brightness,
-                'base_brightness': brightness,
-                'twinkle_speed': twinkle_speed,
-                'twinkle_offset': twinkle_offset
-            })
-    
-    def update(self, dt):
-        """Update star brightness for twinkling effect."""
-        current_time = get_time()
-        for star in self.stars:
-            # Vary brightness using sine wave
-            twinkle = math.sin(current_time * star['twinkle_speed'] + star['twinkle_offset'])
-            # Map -1 to 1 range to 0.5 to 1.0 of base brightness
-            star['brightness'] = star['base_brightness'] * (0.7 + 0.3 * twinkle)
-            
-    def draw(self):
-        glDisable(GL_LIGHTING)
-        glBegin(GL_POINTS)
-        for star in self.stars:
-            b = star['brightness']
-            glColor3f(b, b, b)  # White with variable brightness
-            glVertex3f(*star['pos'])
-        glEnd()
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
+# Sphere tessellations compiled up front: spacecraft glow and selection
+# highlight, background planets, then the planet and Sun levels.
+SPHERE_DETAIL_LEVELS = [(8, 8), (12, 12)] + [(slices, stacks) for _, slices, stacks in SPHERE_LOD_LEVELS]
 
+class GpuBuffer:
+    """An OpenGL buffer object holding the contents of one NumPy array."""
+    def __init__(self, data, target=GL_ARRAY_BUFFER, usage=GL_STATIC_DRAW):
+        self.target = target
+        self.usage = usage
+        self.id = glGenBuffers(1)
+        self.nbytes = 0
+        self.set_data(data)
+    
+    def set_data(self, data):
+        """Replace the whole buffer (reallocating its storage)."""
+        data = np.ascontiguousarray(data)
+        glBindBuffer(self.target, self.id)
+        glBufferData(self.target, data.nbytes, data, self.usage)
+        glBindBuffer(self.target, 0)
+        self.nbytes = data.nbytes
+    
+    def update(self, data, offset=0):
+        """Overwrite part of the buffer in place, starting at byte `offset`."""
+        data = np.ascontiguousarray(data)
+        glBindBuffer(self.target, self.id)
+        glBufferSubData(self.target, offset, data.nbytes, data)
+        glBindBuffer(self.target, 0)
+    
+    def bind(self):
+        glBindBuffer(self.target, self.id)
+    
+    def delete(self):
+        glDeleteBuffers(1, [self.id])
 
-class AsteroidBelt:
-    """Asteroid belt between Mars and Jupiter with individually orbiting asteroids."""
-    def __init__(self, count=200, inner_radius=14.5, outer_radius=16.5):
-        self.asteroids = []
-        for _ in range(count):
-            orbit_radius = random.uniform(inner_radius, outer_radius)
-            orbit_angle = random.uniform(0, 360)
-            orbit_speed = random.uniform(15.0, 22.0)  # Between Mars and Jupiter speeds
-            size = random.uniform(0.05, 0.15)
-            y_offset = random.uniform(-0.3, 0.3)  # Slight vertical variation
-            self.asteroids.append({
-                'orbit_radius': orbit_radius,
-                'orbit_angle': orbit_angle,
-                'orbit_speed': orbit_speed,
-                'size': size,
-                'y_offset': y_offset
-            })
-    
-    def update(self, dt):
-        if state.paused:
+def icosahedron_mesh():
+    """Unit icosahedron as (vertices, triangle indices, spherical uvs).
+    
+    Used as the low-poly asteroid rock; vertices double as normals.
+    """
+    t = (1.0 + math.sqrt(5.0)) / 2.0
+    verts = np.array([
+        (-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0),
+        (0, -1, t), (0, 1, t), (0, -1, -t), (0, 1, -t),
+        (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1),
+    ], dtype=np.float32)
+    verts /= np.linalg.norm(verts, axis=1)[:, np.newaxis]
+    faces = np.array([
+        (0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11),
+        (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6), (7, 1, 8),
+        (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9),
+        (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1),
+    ], dtype=np.uint32)
+    uvs = np.stack([0.5 + np.arctan2(verts[:, 2], verts[:, 0]) / (2 * math.pi),
+                    0.5 + np.arcsin(verts[:, 1]) / math.pi], axis=1).astype(np.float32)
+    return verts, faces, uvs
+
+ROCK_MESH = icosahedron_mesh()
+
+class MeshCache:
+    """Unit-radius sphere meshes compiled once into display lists.
+    
+    Bodies scale a shared mesh instead of allocating a GLU quadric and
+    re-tessellating it every frame. Meshes carry normals and texture
+    coordinates, so the same list serves textured and flat-colored draws
+    (GL_NORMALIZE keeps the scaled normals unit length).
+    """
+    def __init__(self):
+        self.solid = {}  # (slices, stacks) -> display list
+        self.wire = {}
+        self.quadric = None
+        self.wire_quadric = None
+        self.vertices = 0  # Sphere vertices drawn since the caller last reset it
+    
+    def build(self, levels=SPHERE_DETAIL_LEVELS):
+        """Compile the standard detail levels (needs a current GL context)."""
+        for slices, stacks in levels:
+            self.sphere(slices, stacks)
+    
+    def get_quadric(self):
+        """Shared textured, smooth-shaded quadric for the remaining GLU shapes."""
+        if self.quadric is None:
+            self.quadric = gluNewQuadric()
+            gluQuadricTexture(self.quadric, GL_TRUE)
+            gluQuadricNormals(self.quadric, GLU_SMOOTH)
+        return self.quadric
+    
+    def sphere(self, slices, stacks, wire=False):
+        """Display list for a unit sphere, compiled on first use."""
+        lists = self.wire if wire else self.solid
+        list_id = lists.get((slices, stacks))
+        if list_id is None:
+            if wire:
+                if self.wire_quadric is None:
+                    self.wire_quadric = gluNewQuadric()
+                    gluQuadricDrawStyle(self.wire_quadric, GLU_LINE)
+                quadric = self.wire_quadric
+            else:
+                quadric = self.get_quadric()
+            list_id = glGenLists(1)
+            glNewList(list_id, GL_COMPILE)
+            gluSphere(quadric, 1.0, slices, stacks)
+            glEndList()
+            lists[(slices, stacks)] = list_id
+        return list_id
+    
+    def draw_sphere(self, radius, slices, stacks, wire=False):
+        glPushMatrix()
+        glScalef(radius, radius, radius)
+        glCallList(self.sphere(slices, stacks, wire))
+        glPopMatrix()
+        self.vertices += 2 * (slices + 1) * stacks  # One quad strip per stack
+
+class SphereLod:
+    """Picks one body's mesh level from its on-screen radius, with hysteresis.
+    
+    A body moves to a finer level once it is LOD_HYSTERESIS past the
+    current level's limit, and to a coarser one once it is that far under
+    the next-coarser limit, so a body hovering at a limit does not flicker
+    between meshes.
+    """
+    def __init__(self):
+        self.level = None  # 0 = point sprite, i = SPHERE_LOD_LEVELS[i - 1]
+    
+    def select(self, pixel_radius):
+        """(slices, stacks) to draw with, or None for a point sprite."""
+        limits = [SPRITE_PIXEL_RADIUS] + [limit for limit, _, _ in SPHERE_LOD_LEVELS]
+        wanted = next(i for i, limit in enumerate(limits) if pixel_radius <= limit)
+        level = self.level
+        if (level is None or
+                (wanted > level and pixel_radius > limits[level] * (1.0 + LOD_HYSTERESIS)) or
+                (wanted < level and pixel_radius < limits[level - 1] * (1.0 - LOD_HYSTERESIS))):
+            self.level = level = wanted
+        return SPHERE_LOD_LEVELS[level - 1][1:] if level else None
+
+def draw_point_sprite(color, pixel_radius):
+    """A round point the body's on-screen size, at the current origin."""
+    gl_state.disable(GL_LIGHTING)
+    gl_state.disable(GL_TEXTURE_2D)
+    gl_state.enable(GL_POINT_SMOOTH)
+    gl_state.enable(GL_BLEND)
+    gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glPointSize(max(1.0, 2.0 * pixel_radius))
+    glColor3f(*color)
+    glBegin(GL_POINTS)
+    glVertex3f(0.0, 0.0, 0.0)
+    glEnd()
+    glPointSize(1.0)
+    gl_state.disable(GL_BLEND)
+    gl_state.disable(GL_POINT_SMOOTH)
+
+mesh_cache = MeshCache()
+
+# -----------------------------------------------------------------------------
+# Shaders
+# -----------------------------------------------------------------------------
+# GLSL 1.20 programs for the optional programmable path. They read the
+# fixed-function inputs (gl_Vertex, gl_Normal, gl_Color, gl_MultiTexCoord0)
+# so the same display lists and buffers draw under either pipeline.
+BODY_VERTEX_SHADER = """
+#version 120
+varying vec3 v_normal;
+varying vec3 v_eye_pos;
+varying vec2 v_uv;
+varying vec4 v_color;
+void main() {
+    vec4 eye = gl_ModelViewMatrix * gl_Vertex;
+    v_eye_pos = eye.xyz;
+    v_normal = gl_NormalMatrix * gl_Normal;
+    v_uv = gl_MultiTexCoord0.xy;
+    v_color = gl_Color;
+    gl_Position = gl_ProjectionMatrix * eye;
+}
+"""
+
+# Matches the fixed-function setup in init(): ambient 0.2 (light model) +
+# 0.1 (LIGHT0) plus a white diffuse term, textures modulating the color.
+PLANET_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2D u_texture;
+uniform float u_textured;
+uniform float u_lighting;
+uniform vec3 u_light_pos;  // Eye space
+varying vec3 v_normal;
+varying vec3 v_eye_pos;
+varying vec2 v_uv;
+varying vec4 v_color;
+void main() {
+    vec4 color = v_color;
+    if (u_textured > 0.5)
+        color *= texture2D(u_texture, v_uv);
+    float diffuse = max(dot(normalize(v_normal), normalize(u_light_pos - v_eye_pos)), 0.0);
+    color.rgb *= mix(1.0, min(0.3 + diffuse, 1.0), u_lighting);
+    gl_FragColor = color;
+}
+"""
+
+SUN_FRAGMENT_SHADER = """
+#version 120
+uniform sampler2D u_texture;
+uniform float u_textured;
+varying vec3 v_normal;
+varying vec3 v_eye_pos;
+varying vec2 v_uv;
+varying vec4 v_color;
+void main() {
+    vec4 color = v_color;
+    if (u_textured > 0.5)
+        color *= texture2D(u_texture, v_uv);
+    gl_FragColor = color;
+}
+"""
+
+# Vertex j of a trail carries j / capacity (see TrailBuffer); u_ring is
+# (first vertex, point count, capacity) and turns that into the point's age.
+TRAIL_VERTEX_SHADER = """
+#version 120
+uniform vec3 u_ring;
+varying float v_age;
+varying vec4 v_color;
+void main() {
+    float j = gl_MultiTexCoord0.x * u_ring.z;
+    v_age = clamp((j - u_ring.x + 0.5) / u_ring.y, 0.0, 1.0);
+    v_color = gl_Color;
+    gl_Position = ftransform();
+}
+"""
+
+TRAIL_FRAGMENT_SHADER = """
+#version 120
+varying float v_age;
+varying vec4 v_color;
+void main() {
+    gl_FragColor = vec4(v_color.rgb, v_color.a * v_age);
+}
+"""
+
+# a_twinkle is (base brightness, speed, phase), the same curve
+# Starfield._update_colors evaluates on the CPU for the fixed-function path.
+STAR_VERTEX_SHADER = """
+#version 120
+uniform float u_time;
+attribute vec3 a_twinkle;
+varying vec4 v_color;
+void main() {
+    float brightness = a_twinkle.x * (0.7 + 0.3 * sin(u_time * a_twinkle.y + a_twinkle.z));
+    v_color = vec4(vec3(brightness), 1.0);
+    gl_Position = ftransform();
+}
+"""
+
+STAR_FRAGMENT_SHADER = """
+#version 120
+varying vec4 v_color;
+void main() {
+    gl_FragColor = v_color;
+}
+"""
+
+SHADER_SOURCES = {
+    "planet": (BODY_VERTEX_SHADER, PLANET_FRAGMENT_SHADER),
+    "sun": (BODY_VERTEX_SHADER, SUN_FRAGMENT_SHADER),
+    "trail": (TRAIL_VERTEX_SHADER, TRAIL_FRAGMENT_SHADER),
+    "stars": (STAR_VERTEX_SHADER, STAR_FRAGMENT_SHADER),
+}
+
+class ShaderProgram:
+    """A linked GLSL program with cached uniform and attribute locations."""
+    _UNIFORM_SETTERS = {1: glUniform1f, 2: glUniform2f, 3: glUniform3f, 4: glUniform4f}
+    
+    def __init__(self, vertex_source, fragment_source):
+        self.id = compileProgram(compileShader(vertex_source, GL_VERTEX_SHADER),
+                                 compileShader(fragment_source, GL_FRAGMENT_SHADER),
+                                 validate=False)  # Validation depends on the state at link time
+        self.locations = {}
+    
+    def uniform(self, name):
+        """Location of a uniform (-1 if the compiler optimised it away)."""
+        location = self.locations.get(name)
+        if location is None:
+            location = self.locations[name] = glGetUniformLocation(self.id, name)
+        return location
+    
+    def attribute(self, name):
+        key = ("attribute", name)
+        location = self.locations.get(key)
+        if location is None:
+            location = self.locations[key] = glGetAttribLocation(self.id, name)
+        return location
+    
+    def set(self, name, *values):
+        """Set a float/vec uniform on this program (which must be in use)."""
+        location = self.uniform(name)
+        if location >= 0:
+            self._UNIFORM_SETTERS[len(values)](location, *values)
+
+class ShaderLibrary:
+    """The compiled programs, or none when running fixed-function.
+    
+    Programs are compiled once in init(); if the driver lacks GLSL 1.20 or
+    any program fails to build, active stays False and every draw routine
+    takes its fixed-function branch. Uniforms that only change per frame
+    (the light) are set once in begin_frame() rather than per draw.
+    """
+    def __init__(self, enabled=SHADERS_ENABLED):
+        self.enabled = enabled
+        self.programs = {}
+        self.keep_bound = False  # Set while a RenderQueue manages the current program
+    
+    @property
+    def active(self):
+        return bool(self.programs)
+    
+    def init(self):
+        """Compile every program (needs a current GL context)."""
+        if not self.enabled:
             return
-        adj_dt = dt * state.speed_multiplier
-        for asteroid in self.asteroids:
-            asteroid['orbit_angle'] += asteroid['orbit_speed'] * adj_dt
-            if asteroid['orbit_angle'] >= 360.0:
-                asteroid['orbit_angle'] -= 360.0
+        try:
+            if not bool(glCreateShader):
+                raise RuntimeError("GLSL not supported by this driver")
+            programs = {name: ShaderProgram(*sources) for name, sources in SHADER_SOURCES.items()}
+        except Exception as e:
+            print(f"Shaders unavailable, using the fixed-function pipeline ({str(e).splitlines()[0]})")
+            return
+        self.programs = programs
+        for name in ("planet", "sun"):
+            gl_state.use_program(programs[name].id)
+            glUniform1i(programs[name].uniform("u_texture"), 0)
+        gl_state.use_program(0)
+    
+    @contextlib.contextmanager
+    def program(self, name):
+        """Use a program for the draws inside the block, then go back to fixed function."""
+        program = self.programs[name]
+        gl_state.use_program(program.id)
+        try:
+            yield program
+        finally:
+            if not self.keep_bound:
+                gl_state.use_program(0)
+    
+    def program_id(self, name):
+        """GL id of a program, or 0 when drawing fixed-function."""
+        return self.programs[name].id if self.active else 0
+    
+    def begin_frame(self):
+        """Set the per-frame uniforms; call with the camera's modelview applied."""
+        if not self.active:
+            return
+        # GL_LIGHT0 as the fixed-function path would see it (stored in eye space)
+        light = glGetLightfv(GL_LIGHT0, GL_POSITION)
+        with self.program("planet") as program:
+            program.set("u_light_pos", float(light[0]), float(light[1]), float(light[2]))
+            program.set("u_lighting", 1.0 if state.lighting_enabled else 0.0)
+
+shaders = ShaderLibrary()
+
+# -----------------------------------------------------------------------------
+# Render Queue
+# -----------------------------------------------------------------------------
+# Passes, drawn in this order
+PASS_OPAQUE = 0    # Depth-tested, not blended: grouped by material
+PASS_ORDERED = 1   # Lines, sprites, rings and trails, in submission order
+PASS_OVERLAY = 2   # Drawn over everything, in submission order
+
+class RenderQueue:
+    """One frame's draw items, drawn in an order that groups shared state.
+    
+    Subsystems submit a callable per draw with its material (shader
+    program and texture, 0 for none) and world position instead of drawing
+    in object order. flush() sorts opaque items by (program, texture,
+    depth) so each material is set up once and nearer surfaces fill the
+    depth buffer first. Everything else keeps submission order: blended
+    items still write depth, so sorting them would change which orbit
+    lines, trails and sprites hide each other. The queue binds each
+    item's program; items keep it bound (see ShaderLibrary.keep_bound) so
+    a run of items sharing a program costs one switch.
+    """
+    def __init__(self):
+        self.items = []
+        self.eye = (0.0, 0.0, 0.0)
+    
+    def begin(self, eye):
+        """Start a frame seen from eye (depths are distances from it)."""
+        self.items = []
+        self.eye = tuple(eye)
+    
+    def submit(self, pass_, draw, scope, program=0, texture=0, at=None):
+        """Queue draw() for this frame; scope names its profiler bucket, at sorts opaque items."""
+        if pass_ == PASS_OPAQUE:
+            depth = math.dist(self.eye, at) if at is not None else 0.0
+            key = (pass_, program, texture, depth)
+        else:
+            key = (pass_,)
+        self.items.append((key, len(self.items), program, scope, draw))
+    
+    def flush(self):
+        """Draw and clear the queued items."""
+        self.items.sort(key=lambda item: item[:2])
+        shaders.keep_bound = True
+        try:
+            for _, _, program, scope, draw in self.items:
+                gl_state.use_program(program)
+                with profiler.scope(scope, gpu=True):
+                    draw()
+        finally:
+            shaders.keep_bound = False
+            gl_state.use_program(0)
+            self.items = []
+
+# -----------------------------------------------------------------------------
+# Retained Geometry
+# -----------------------------------------------------------------------------
+class BakedGeometry:
+    """Vertices (and optional per-vertex RGBA colors) stored in GPU buffers."""
+    def __init__(self, mode, vertices, colors=None):
+        self.mode = mode
+        self.count = len(vertices)
+        self.vertices = GpuBuffer(np.asarray(vertices, dtype=np.float32))
+        self.colors = GpuBuffer(np.asarray(colors, dtype=np.float32)) if colors is not None else None
     
     def draw(self):
-        if state.planets_hidden:
-            return
-        glDisable(GL_LIGHTING)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        self.vertices.bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        if self.colors:
+            glEnableClientState(GL_COLOR_ARRAY)
+            self.colors.bind()
+            glColorPointer(4, GL_FLOAT, 0, None)
         
-        # Use texture if available
-        use_texture = "Asteroid" in planet_textures
-        if use_texture:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, planet_textures["Asteroid"])
-            glColor3f(1.0, 1.0, 1.0)
-        else:
-            glColor3f(0.5, 0.45, 0.4)  # Grey-brown asteroid color
+        glDrawArrays(self.mode, 0, self.count)
         
-        for asteroid in self.asteroids:
-            rad = math.radians(asteroid['orbit_angle'])
-            x = math.cos(rad) * asteroid['orbit_radius']
-            z = math.sin(rad) * asteroid['orbit_radius']
-            y = asteroid['y_offset']
-            
-            glPushMatrix()
-            glTranslatef(x, y, z)
-            
-            if use_texture:
-                quadric = gluNewQuadric()
-                gluQuadricTexture(quadric, GL_TRUE)
-                gluSphere(quadric, asteroid['size'], 6, 6)
-                gluDeleteQuadric(quadric)
-            else:
-                glutSolidSphere(asteroid['size'], 6, 6)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        if self.colors:
+            glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+    
+    def delete(self):
+        self.vertices.delete()
+        if self.colors:
+            self.colors.delete()
+
+class GeometryRegistry:
+    """Static geometry baked once and re-baked only when its parameters change.
+    
+    get(name, params, builder) returns the geometry registered under `name`,
+    calling builder(*params) only the first time or when `params` differ
+    from the ones the current buffers were built with. The frame loop then
+    just binds and draws.
+    """
+    def __init__(self):
+        self.entries = {}  # name -> (params, BakedGeometry)
+    
+    def get(self, name, params, builder):
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == params:
+            return entry[1]
+        if entry is not None:
+            entry[1].delete()
+        geometry = builder(*params)
+        self.entries[name] = (params, geometry)
+        return geometry
+
+def circle_points(radius, segments, closed=False):
+    """Points on a circle in the XZ plane (repeating the first one if closed)."""
+    theta = 2.0 * np.pi * np.arange(segments + 1 if closed else segments) / segments
+    return np.stack([radius * np.cos(theta), np.zeros_like(theta), radius * np.sin(theta)], axis=1)
+
+def orbit_geometry(radius, segments=64):
+    return BakedGeometry(GL_LINE_LOOP, circle_points(radius, segments))
+
+def ring_geometry(inner, outer, color, segments=64):
+    """Triangle strip alternating outer and (more transparent) inner edge."""
+    vertices = np.empty((2 * (segments + 1), 3))
+    vertices[0::2] = circle_points(outer, segments, closed=True)
+    vertices[1::2] = circle_points(inner, segments, closed=True)
+    colors = np.empty((len(vertices), 4))
+    colors[0::2] = color
+    colors[1::2] = (color[0], color[1], color[2], color[3] * 0.7)
+    return BakedGeometry(GL_TRIANGLE_STRIP, vertices, colors)
+
+def scanline_geometry(width, height, spacing=3):
+    rows = np.arange(0, height, spacing)
+    vertices = np.zeros((2 * len(rows), 3))
+    vertices[0::2, 1] = rows
+    vertices[1::2, 0] = width
+    vertices[1::2, 1] = rows
+    return BakedGeometry(GL_LINES, vertices)
+
+geometry_registry = GeometryRegistry()
+
+# -----------------------------------------------------------------------------
+# N-Body Physics
+# -----------------------------------------------------------------------------
+def gravity_accelerations(targets, sources, masses, softening=NBODY_SOFTENING):
+    """Acceleration (G = 1) at each of K targets from M point masses.
+    
+    All K x M pairs are evaluated as one array expression. A target that is
+    also a source sees itself at distance zero, which the softening turns
+    into a zero contribution.
+    """
+    d = sources[np.newaxis, :, :] - targets[:, np.newaxis, :]
+    r2 = np.einsum("kmi,kmi->km", d, d) + softening * softening
+    weights = masses / (r2 * np.sqrt(r2))
+    return np.einsum("km,kmi->ki", weights, d)
+
+class NBodySystem:
+    """Sun, planets, spacecraft and (optionally) asteroids under real gravity.
+    
+    The first `massive` rows are the Sun and planets, which attract
+    everything; the remaining rows (spacecraft, then asteroids) are test
+    particles that only feel them. State is integrated with kick-drift-kick
+    leapfrog, which is symplectic, so orbits keep their energy over long
+    runs instead of spiralling. Positions are handed back relative to the
+    Sun, which itself wobbles around the barycentre.
+    
+    With a belt mass the asteroids also pull on each other and on the
+    other bodies. That weak, expensive force is applied as a half kick at
+    each end of a step (impulse splitting) from a double-buffered field:
+    each step evaluates one of belt_slices slices of it against a snapshot
+    of the belt, and the finished field replaces the one in use. No step
+    pays for a whole evaluation; in exchange the pull lags the belt by up
+    to 2 * belt_slices steps (and is zero until the first one finishes).
+    """
+    def __init__(self, positions, velocities, masses, massive, belt_start=None, belt_mass=0.0):
+        self.pos = np.asarray(positions, dtype=np.float64)
+        self.vel = np.asarray(velocities, dtype=np.float64)
+        self.mass = np.asarray(masses[:massive], dtype=np.float64)
+        self.massive = massive
+        self.rows = len(self.pos)
+        # Rows from belt_start on pull on everything with belt_mass each
+        self.belt_start = belt_start
+        self.belt_mass = belt_mass if belt_start is not None else 0.0
+        self._belt_acc = None  # Belt pull in use
+        self._belt_next = None  # Belt pull being evaluated
+        self._belt_source = None  # Snapshot it is evaluated from (see belt_snapshot)
+        self._belt_slice = 0  # Slices of it done
+        rocks = self.rows - belt_start if belt_start is not None else 0
+        self.belt_slices = max(1, math.ceil(rocks / NBODY_BELT_ROCKS_PER_STEP))  # Steps per evaluation
+        
+        # Start from the centre-of-mass frame so the system does not drift away
+        total = self.mass.sum()
+        self.pos -= (self.mass[:, np.newaxis] * self.pos[:massive]).sum(0) / total
+        self.vel -= (self.mass[:, np.newaxis] * self.vel[:massive]).sum(0) / total
+    
+    @staticmethod
+    def circular_velocities(positions):
+        """Velocities for circular, counter-clockwise (seen from +y) orbits of the Sun."""
+        positions = np.asarray(positions, dtype=np.float64)
+        r = np.maximum(np.hypot(positions[:, 0], positions[:, 2]), 1e-9)
+        speed = np.sqrt(NBODY_SUN_MASS / r)
+        # Tangent direction (-sin, cos) in xz, matching the scripted orbits
+        return np.stack([-positions[:, 2] / r * speed, np.zeros_like(r),
+                         positions[:, 0] / r * speed], axis=1)
+    
+    @classmethod
+    def from_system(cls, system, include_asteroids=NBODY_ASTEROIDS, asteroid_mass=None, **kwargs):
+        """Start from the system's current positions on circular orbits."""
+        if asteroid_mass is None:
+            asteroid_mass = system.asteroid_mass
+        bodies = [(0.0, 0.0, 0.0)] + [p.world_pos for p in system.planets] + [system.spacecraft.pos]
+        positions = [np.asarray(bodies, dtype=np.float64)]
+        if include_asteroids:
+            positions.append(system.asteroid_belt.positions().astype(np.float64))
+        positions = np.concatenate(positions)
+        
+        velocities = cls.circular_velocities(positions)
+        velocities[0] = 0.0  # The Sun
+        masses = [NBODY_SUN_MASS] + [NBODY_PLANET_MASSES[p.name] * NBODY_SUN_MASS
+                                     for p in system.planets]
+        belt_start = len(bodies) if include_asteroids and asteroid_mass > 0 else None
+        return cls(positions, velocities, masses, massive=len(masses),
+                   belt_start=belt_start, belt_mass=asteroid_mass * NBODY_SUN_MASS, **kwargs)
+    
+    def accelerations(self):
+        return gravity_accelerations(self.pos, self.pos[:self.massive], self.mass)
+    
+    def belt_accelerations(self):
+        """Pull of the belt on every row, from the last finished evaluation."""
+        if self._belt_acc is None:
+            self._belt_acc = np.zeros_like(self.pos)
+        return self._belt_acc
+    
+    def _next_belt_slice(self, rocks):
+        """This step's share of the belt evaluation: (snapshot, units, whether it is the last).
+        
+        A new evaluation snapshots rocks when the previous one has finished.
+        """
+        if self._belt_source is None:
+            self._belt_source = belt_snapshot(rocks, self.belt_mass)
+        source = self._belt_source
+        units = belt_slice(source, self.belt_slices, self._belt_slice)
+        self._belt_slice += 1
+        last = self._belt_slice == self.belt_slices
+        if last:
+            self._belt_source = None
+            self._belt_slice = 0
+        return source, units, last
+    
+    def _evaluate_belt_slice(self):
+        """Evaluate this step's slice of the belt's pull; the last one swaps the field in."""
+        source, units, last = self._next_belt_slice(self.pos[self.belt_start:])
+        if self._belt_next is None:
+            self._belt_next = np.empty_like(self.pos)
+        index, acc = belt_self_gravity(source, self.belt_mass, units)
+        self._belt_next[self.belt_start + index] = acc
+        if last:
+            self._belt_next[:self.belt_start] = belt_field(source, self.pos[:self.belt_start], self.belt_mass)
+            self._belt_acc, self._belt_next = self._belt_next, self.belt_accelerations()
+    
+    def substeps(self, dt):
+        """Substeps needed so none is longer than NBODY_ETA dynamical times."""
+        offsets = self.pos[1:self.massive + 1] - self.pos[0]  # Planets and spacecraft
+        r = np.sqrt(np.einsum("ij,ij->i", offsets, offsets))
+        t_dyn = np.sqrt(r.min() ** 3 / self.mass[0])
+        return int(min(NBODY_MAX_SUBSTEPS, max(1, math.ceil(abs(dt) / (NBODY_ETA * t_dyn)))))
+    
+    def step(self, dt):
+        n = self.substeps(dt)
+        h = dt / n
+        if self.belt_mass:
+            self.vel += 0.5 * dt * self.belt_accelerations()
+            self._evaluate_belt_slice()
+        acc = self.accelerations()
+        for _ in range(n):
+            self.vel += 0.5 * h * acc
+            self.pos += h * self.vel
+            acc = self.accelerations()
+            self.vel += 0.5 * h * acc
+        if self.belt_mass:
+            self.vel += 0.5 * dt * self.belt_accelerations()
+    
+    def finish(self):
+        """Nothing to wait for: step() runs to completion."""
+    
+    def heliocentric(self, rows):
+        """Positions of the given rows relative to the Sun."""
+        return self.pos[rows] - self.pos[0]
+    
+    def set_heliocentric(self, row, pos, velocity):
+        """Move one body (e.g. the piloted spacecraft) to a Sun-relative state."""
+        self.pos[row] = self.pos[0] + pos
+        self.vel[row] = self.vel[0] + velocity
+
+def morton_keys(cells):
+    """Interleave the bits of (N, 3) integer cell coordinates (< 2**21) into Z-order keys."""
+    def spread(v):
+        v = v.astype(np.uint64) & np.uint64(0x1fffff)
+        for shift, mask in ((32, 0x1f00000000ffff), (16, 0x1f0000ff0000ff),
+                            (8, 0x100f00f00f00f00f), (4, 0x10c30c30c30c30c3),
+                            (2, 0x1249249249249249)):
+            v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+        return v
+    return spread(cells[:, 0]) | (spread(cells[:, 1]) << np.uint64(1)) | (spread(cells[:, 2]) << np.uint64(2))
+
+def expand_ranges(starts, counts):
+    """Concatenated aranges [start, start + count) and the index of the range each came from."""
+    owner = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts, counts) + (np.arange(counts.sum()) - offsets[owner]), owner
+
+class BarnesHutTree:
+    """Octree of point masses for O(N log N) gravity (G = 1).
+    
+    Built fully vectorized: bodies are sorted along a Morton (Z-order)
+    curve, so every cell is a contiguous run of the sorted arrays and a
+    level of the tree is found by where the key prefixes change. Each cell
+    keeps its mass, centre of mass and side length; cells with more than
+    leaf_size bodies are split until MAX_DEPTH.
+    
+    Forces are evaluated for groups of targets at once: a group walks the
+    tree together, a cell that is small enough as seen from the whole group
+    (side / distance < theta) acts as a point mass at its centre of mass,
+    and leaves that are too close are summed body by body.
+    """
+    MAX_DEPTH = 21        # Bits per axis in a 64-bit Morton key
+    CHUNK = 1 << 21       # Pairwise interactions evaluated per array pass
+    ARRAYS = ("order", "pos", "mass", "start", "end", "size", "first_child", "child_count",
+              "cell_mass", "com", "leaves")  # Everything a built tree consists of
+    
+    def __init__(self, positions, masses, leaf_size=None):
+        positions = np.asarray(positions, dtype=np.float64)
+        masses = np.broadcast_to(np.asarray(masses, dtype=np.float64), positions.shape[:1])
+        leaf_size = leaf_size or BARNES_HUT_LEAF_SIZE
+        depth = self.MAX_DEPTH
+        
+        lo = positions.min(axis=0)
+        extent = max(float((positions.max(axis=0) - lo).max()), 1e-9) * (1.0 + 1e-9)
+        cells = np.minimum(((positions - lo) / extent * (1 << depth)).astype(np.int64), (1 << depth) - 1)
+        keys = morton_keys(cells)
+        self.order = np.argsort(keys, kind="stable")
+        keys = keys[self.order]
+        self.pos = positions[self.order]
+        self.mass = masses[self.order]
+        n = len(keys)
+        
+        # Prefix sums give any cell's mass and first moment in O(1)
+        mass_sum = np.concatenate([[0.0], np.cumsum(self.mass)])
+        moment_sum = np.vstack([np.zeros(3), np.cumsum(self.pos * self.mass[:, np.newaxis], axis=0)])
+        
+        # Level by level: cell ranges [start, end), side lengths, children
+        starts, ends, sizes, first_child, child_count = [np.array([0])], [np.array([n])], [np.array([extent])], [], []
+        level_start, level_end = starts[0], ends[0]
+        node_base = 1
+        for level in range(1, depth + 1):
+            split = (level_end - level_start) > leaf_size
+            if not split.any():
+                first_child.append(np.zeros(len(level_start), dtype=np.int64))
+                child_count.append(np.zeros(len(level_start), dtype=np.int64))
+                break
+            # Bodies inside cells being split, and where their level prefix changes
+            index, parent = expand_ranges(level_start[split], (level_end - level_start)[split])
+            prefix = keys[index] >> np.uint64(3 * (depth - level))
+            new_run = np.ones(len(index), dtype=bool)
+            new_run[1:] = (prefix[1:] != prefix[:-1]) | (parent[1:] != parent[:-1])
+            child_start = index[new_run]
+            child_parent = parent[new_run]
+            child_end = np.append(child_start[1:], 0)
+            last = np.append(child_parent[1:] != child_parent[:-1], True)
+            child_end[last] = level_end[split][child_parent[last]]
+            
+            counts = np.zeros(len(level_start), dtype=np.int64)
+            counts[split] = np.bincount(child_parent, minlength=split.sum())
+            firsts = np.zeros(len(level_start), dtype=np.int64)
+            firsts[split] = node_base + np.searchsorted(child_parent, np.arange(split.sum()))
+            first_child.append(firsts)
+            child_count.append(counts)
             
-            glPopMatrix()
+            node_base += len(child_start)
+            level_start, level_end = child_start, child_end
+            starts.append(level_start)
+            ends.append(level_end)
+            sizes.append(np.full(len(level_start), extent / (1 << level)))
+        else:
+            first_child.append(np.zeros(len(level_start), dtype=np.int64))
+            child_count.append(np.zeros(len(level_start), dtype=np.int64))
+        
+        self.start = np.concatenate(starts)
+        self.end = np.concatenate(ends)
+        self.size = np.concatenate(sizes)
+        self.first_child = np.concatenate(first_child)
+        self.child_count = np.concatenate(child_count)
+        self.cell_mass = mass_sum[self.end] - mass_sum[self.start]
+        self.com = (moment_sum[self.end] - moment_sum[self.start]) / np.maximum(self.cell_mass, 1e-300)[:, np.newaxis]
+        self.leaves = np.flatnonzero(self.child_count == 0)
+    
+    def __len__(self):
+        return len(self.start)
+    
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+    
+    @classmethod
+    def from_arrays(cls, arrays):
+        """A tree over already-built arrays (e.g. views of shared memory), without rebuilding."""
+        tree = cls.__new__(cls)
+        tree.__dict__.update(arrays)
+        return tree
+    
+    def _walk(self, centers, radii, theta):
+        """Interaction lists for groups: (group, far cell) and (group, near leaf) pairs."""
+        group = np.arange(len(centers))
+        cell = np.zeros(len(centers), dtype=np.int64)
+        far, near = [], []
+        while len(group):
+            offset = self.com[cell] - centers[group]
+            dist = np.sqrt(np.einsum("ij,ij->i", offset, offset))
+            accept = self.size[cell] + radii[group] < theta * dist
+            far.append((group[accept], cell[accept]))
+            is_leaf = self.child_count[cell] == 0
+            near_mask = ~accept & is_leaf
+            near.append((group[near_mask], cell[near_mask]))
+            
+            opened = ~accept & ~is_leaf
+            cell, owner = expand_ranges(self.first_child[cell[opened]], self.child_count[cell[opened]])
+            group = group[opened][owner]
+        return [np.concatenate(parts) for parts in zip(*far)], [np.concatenate(parts) for parts in zip(*near)]
+    
+    def _accumulate(self, acc, targets, target_idx, source_pos, source_mass):
+        """acc[target_idx] += pull of each source (one row per interaction)."""
+        d = source_pos - targets[target_idx]
+        r2 = np.einsum("ij,ij->i", d, d) + NBODY_SOFTENING * NBODY_SOFTENING
+        w = source_mass / (r2 * np.sqrt(r2))
+        for axis in range(3):
+            acc[:, axis] += np.bincount(target_idx, weights=w * d[:, axis], minlength=len(acc))
+    
+    def _evaluate(self, targets, group_start, group_count, centers, radii, theta):
+        (far_group, far_cell), (near_group, near_leaf) = self._walk(centers, radii, theta)
+        
+        # Far field: each accepted cell's pull and its gradient at the group
+        # centre, summed per group, then extrapolated linearly to each target
+        n_groups = len(centers)
+        d = self.com[far_cell] - centers[far_group]
+        r2 = np.einsum("ij,ij->i", d, d) + NBODY_SOFTENING * NBODY_SOFTENING
+        inv_r3 = self.cell_mass[far_cell] / (r2 * np.sqrt(r2))
+        inv_r5 = 3.0 * inv_r3 / r2
+        field = np.empty((n_groups, 3))
+        gradient = np.empty((n_groups, 3, 3))
+        for i in range(3):
+            field[:, i] = np.bincount(far_group, weights=inv_r3 * d[:, i], minlength=n_groups)
+            for j in range(i, 3):
+                w = inv_r5 * d[:, i] * d[:, j]
+                if i == j:
+                    w = w - inv_r3
+                gradient[:, i, j] = gradient[:, j, i] = np.bincount(far_group, weights=w, minlength=n_groups)
+        
+        owner = np.repeat(np.arange(n_groups), group_count)
+        index = np.repeat(group_start, group_count) + (np.arange(len(owner)) - np.repeat(np.cumsum(group_count) - group_count, group_count))
+        acc = np.zeros_like(targets)
+        acc[index] = field[owner] + np.einsum("kij,kj->ki", gradient[owner], targets[index] - centers[owner])
+        
+        # Near field: every target in the group against every body in the leaf
+        leaf_counts = self.end[near_leaf] - self.start[near_leaf]
+        counts = group_count[near_group] * leaf_counts
+        for lo, hi in self._chunks(counts):
+            k, owner = expand_ranges(np.zeros(hi - lo, dtype=np.int64), counts[lo:hi])
+            per_target = leaf_counts[lo:hi][owner]
+            target_idx = group_start[near_group[lo:hi]][owner] + k // per_target
+            source_idx = self.start[near_leaf[lo:hi]][owner] + k % per_target
+            self._accumulate(acc, targets, target_idx, self.pos[source_idx], self.mass[source_idx])
+        return acc
+    
+    def _chunks(self, counts):
+        """Split pair lists so each pass expands to about CHUNK interactions."""
+        if not len(counts):
+            return
+        total = np.cumsum(counts)
+        cuts = np.searchsorted(total, np.arange(self.CHUNK, total[-1], self.CHUNK), side="right")
+        bounds = np.unique(np.concatenate([[0], cuts, [len(counts)]]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            yield lo, hi
+    
+    def accelerations(self, theta=None):
+        """Self-gravity at every body, in the original (unsorted) order."""
+        index, acc_part = self.accelerations_for(self.leaves, theta)
+        acc = np.empty_like(self.pos)
+        acc[index] = acc_part
+        return acc
+    
+    def accelerations_for(self, leaves, theta=None):
+        """Self-gravity at the bodies in some leaves: (original indices, accelerations).
+        
+        Lets a worker pool split one evaluation by leaf ranges.
+        """
+        theta = BARNES_HUT_THETA if theta is None else theta
+        starts, counts = self.start[leaves], self.end[leaves] - self.start[leaves]
+        centers = self.com[leaves]
+        # Group radius: farthest body from the leaf's centre of mass
+        index, owner = expand_ranges(starts, counts)
+        spread = np.linalg.norm(self.pos[index] - centers[owner], axis=1)
+        radii = np.zeros(len(leaves))
+        np.maximum.at(radii, owner, spread)
+        
+        acc_sorted = self._evaluate(self.pos, starts, counts, centers, radii, theta)
+        return self.order[index], acc_sorted[index]
+    
+    def field_at(self, points, theta=None):
+        """Acceleration the tree's bodies exert at arbitrary points."""
+        theta = BARNES_HUT_THETA if theta is None else theta
+        points = np.asarray(points, dtype=np.float64)
+        n = len(points)
+        return self._evaluate(points, np.arange(n), np.ones(n, dtype=np.int64), points, np.zeros(n), theta)
+
+def belt_snapshot(rocks, mass):
+    """What a belt evaluation works from: a copy of the rocks, or a tree over them for big belts."""
+    if len(rocks) < BARNES_HUT_MIN_BODIES:
+        return np.array(rocks, dtype=np.float64)
+    return BarnesHutTree(rocks, mass)
+
+def belt_slice(source, slices, index):
+    """The index-th of `slices` shares of a snapshot's work: tree leaves, or rock rows."""
+    units = source.leaves if isinstance(source, BarnesHutTree) else np.arange(len(source))
+    return np.array_split(units, slices)[index]
+
+def belt_self_gravity(source, mass, units):
+    """Self-gravity at the rocks in some units of a snapshot: (rock indices, accelerations)."""
+    if isinstance(source, BarnesHutTree):
+        return source.accelerations_for(units)
+    return units, gravity_accelerations(source[units], source, np.full(len(source), mass))
+
+def belt_field(source, points, mass):
+    """Pull of a belt snapshot at arbitrary points."""
+    if isinstance(source, BarnesHutTree):
+        return source.field_at(points)
+    return gravity_accelerations(points, source, np.full(len(source), mass))
+
+# Worker side of PhysicsWorkerPool: shared arrays attached once per process
+_shared_arrays = {}
+_shared_blocks = []
+_shared_tree = {}  # "block": the published tree's shared memory, once attached
+
+def _attach_shared_arrays(specs):
+    for key, (name, shape) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared_blocks.append(block)
+        _shared_arrays[key] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+
+def _step_particle_chunk(lo, hi, src, substeps, h):
+    """Leapfrog rows lo:hi of the belt through one step along the recorded massive-body path."""
+    arrays = _shared_arrays
+    pos = arrays["pos"][src, lo:hi].copy()
+    vel = arrays["vel"][lo:hi]
+    path, mass = arrays["path"], arrays["mass"]
+    acc = gravity_accelerations(pos, path[0], mass)
+    for i in range(substeps):
+        vel += 0.5 * h * acc
+        pos += h * vel
+        acc = gravity_accelerations(pos, path[i + 1], mass)
+        vel += 0.5 * h * acc
+    arrays["pos"][1 - src, lo:hi] = pos
+
+def _attach_tree(spec):
+    """The tree PhysicsWorkerPool.publish_tree() last shared (re-attached if its block moved)."""
+    name, layout = spec
+    block = _shared_tree.get("block")
+    if block is None or block.name != name:
+        if block is not None:
+            block.close()
+        block = _shared_tree["block"] = shared_memory.SharedMemory(name=name)
+    return BarnesHutTree.from_arrays({key: np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+                                      for key, dtype, shape, offset in layout})
+
+def _belt_acceleration_chunk(tree_spec, buffer, leaves):
+    """Barnes-Hut pull on the bodies in some of the shared tree's leaves, into belt_acc[buffer]."""
+    tree = _attach_tree(tree_spec)
+    index, acc = tree.accelerations_for(leaves)
+    _shared_arrays["belt_acc"][buffer][index] = acc
+
+class PhysicsWorkerPool:
+    """Process pool plus shared-memory state for stepping the asteroid belt.
+    
+    Belt positions are double-buffered: pos[front] is the last finished
+    step, which the renderer reads, while workers write the next step into
+    the other buffer. Velocities, the massive-body path for the current
+    step and the belt's self-gravity (double-buffered too: the field in use
+    and the one being evaluated) also live in shared memory, so tasks only
+    carry row ranges. The belt's Barnes-Hut tree is built once per
+    evaluation and published to shared memory too (see publish_tree), and
+    each worker only walks the leaves it is given. Made once per
+    SolarSystem and reused each time N-body mode is switched on.
+    """
+    def __init__(self, workers, count, massive):
+        self.workers = workers
+        self.count = count
+        shapes = {
+            "pos": (2, count, 3),
+            "vel": (count, 3),
+            "path": (NBODY_MAX_SUBSTEPS + 1, massive, 3),
+            "mass": (massive,),
+            "belt_acc": (2, count, 3),
+        }
+        self.blocks = {}
+        self.arrays = {}
+        specs = {}
+        for key, shape in shapes.items():
+            block = shared_memory.SharedMemory(create=True, size=max(8, 8 * math.prod(shape)))
+            self.blocks[key] = block
+            self.arrays[key] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+            specs[key] = (block.name, shape)
+        
+        # Spawn rather than fork: the parent already owns a GL context.
+        ctx = multiprocessing.get_context("spawn")
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_attach_shared_arrays, initargs=(specs,))
+        # Runs each step in the background and hands back its errors
+        self.coordinator = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        bounds = np.linspace(0, count, workers + 1).astype(int)
+        self.chunks = [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+    
+    def publish_tree(self, tree):
+        """Copy a BarnesHutTree into shared memory; returns the spec workers attach it by.
+        
+        The block is reused while the tree fits and replaced by a larger
+        one when it does not (workers re-attach by name).
+        """
+        arrays = tree.arrays()
+        layout, size = [], 0
+        for key, array in arrays.items():
+            layout.append((key, array.dtype.str, array.shape, size))
+            size += array.nbytes
+        block = self.blocks.get("tree")
+        if block is None or block.size < size:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = self.blocks["tree"] = shared_memory.SharedMemory(create=True, size=max(8, size + size // 2))
+        for (key, dtype, shape, offset), array in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)[...] = array
+        return block.name, layout
+    
+    def submit(self, fn, tasks):
+        """Start fn over task argument tuples in the pool; returns their futures."""
+        return [self.executor.submit(fn, *args) for args in tasks]
+    
+    def wait(self, futures):
+        """Wait for futures from submit(), re-raising the first error."""
+        for future in futures:
+            future.result()
+    
+    def close(self):
+        self.coordinator.shutdown(wait=True)
+        self.executor.shutdown(wait=True)
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+class ParallelNBodySystem(NBodySystem):
+    """NBodySystem whose asteroid rows are stepped by a PhysicsWorkerPool.
+    
+    The Sun, planets and spacecraft are integrated here first, recording
+    the massive bodies' positions at every substep; belt chunks then follow
+    that path in the workers with the same leapfrog. Rocks never pull on
+    the massive bodies' path within a step (the belt's own gravity is
+    applied as half kicks around the whole step), so the result matches the
+    serial integrator. The step's slice of the belt's self-gravity runs in
+    the workers alongside the belt chunks. A step runs on a background thread: step() returns
+    at once and the renderer keeps reading the previous, complete state
+    until the next step() or finish() swaps it in, so what is drawn lags
+    the physics by one step.
+    """
+    def __init__(self, positions, velocities, masses, massive, belt_start=None, belt_mass=0.0, pool=None):
+        self.pool = pool
+        self.first_rock = massive + 1  # After the Sun, planets and spacecraft
+        super().__init__(positions, velocities, masses, massive, belt_start, belt_mass)
+        
+        # Main rows stay local (front copy for the renderer); rocks go to shared memory
+        arrays = pool.arrays
+        arrays["pos"][0] = self.pos[self.first_rock:]
+        arrays["vel"][:] = self.vel[self.first_rock:]
+        arrays["mass"][:] = self.mass
+        arrays["belt_acc"][:] = 0.0
+        self.pos = self.pos[:self.first_rock].copy()
+        self.vel = self.vel[:self.first_rock].copy()
+        self.belt_front = 0  # belt_acc[belt_front] is the rocks' share of the pull in use
+        self._belt_tree = None  # (tree, spec) last published to the workers
+        self.front = 0
+        self.shown = self.pos.copy()  # Main rows matching pos[front]
+        self.pending = None  # Future of the step in flight
+    
+    def finish(self):
+        """Wait for the step in flight and make its result current."""
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            pending.result()  # Re-raises anything that went wrong in the step
+            self.front = 1 - self.front
+            self.shown = self.pos.copy()
+    
+    def step(self, dt):
+        self.finish()
+        self.pending = self.pool.coordinator.submit(self._step, dt)
+    
+    def _step(self, dt):
+        pool, arrays = self.pool, self.pool.arrays
+        src = self.front
+        n = self.substeps(dt)
+        h = dt / n
         
+        belt_tasks, swap = [], False
+        if self.belt_mass:
+            self.vel += 0.5 * dt * self.belt_accelerations()
+            arrays["vel"] += 0.5 * dt * arrays["belt_acc"][self.belt_front]
+            belt_tasks, swap = self._start_belt_slice(src)
+        
+        # Main rows: serial leapfrog, recording where the massive bodies are
+        path = arrays["path"]
+        path[0] = self.pos[:self.massive]
+        acc = gravity_accelerations(self.pos, self.pos[:self.massive], self.mass)
+        for i in range(n):
+            self.vel += 0.5 * h * acc
+            self.pos += h * self.vel
+            path[i + 1] = self.pos[:self.massive]
+            acc = gravity_accelerations(self.pos, self.pos[:self.massive], self.mass)
+            self.vel += 0.5 * h * acc
+        
+        pool.wait(pool.submit(_step_particle_chunk, [(lo, hi, src, n, h) for lo, hi in pool.chunks]) + belt_tasks)
+        
+        if self.belt_mass:
+            if swap:
+                self.belt_front = 1 - self.belt_front
+                self._belt_acc, self._belt_next = self._belt_next, self.belt_accelerations()
+            self.vel += 0.5 * dt * self.belt_accelerations()
+            arrays["vel"] += 0.5 * dt * arrays["belt_acc"][self.belt_front]
+    
+    def _start_belt_slice(self, src):
+        """Start this step's slice of the belt evaluation: (futures, whether to swap after them).
+        
+        Tree walks go to the workers, split by leaves; the direct sum used
+        for small belts and the pull on the main rows are cheap and run here.
+        """
+        pool = self.pool
+        back = 1 - self.belt_front
+        source, units, last = self._next_belt_slice(pool.arrays["pos"][src])
+        if last:
+            self._belt_next = belt_field(source, self.pos, self.belt_mass)
+        if not isinstance(source, BarnesHutTree):
+            index, acc = belt_self_gravity(source, self.belt_mass, units)
+            pool.arrays["belt_acc"][back][index] = acc
+            return [], last
+        if self._belt_tree is None or self._belt_tree[0] is not source:
+            # One tree per evaluation, shared with the workers that walk it
+            self._belt_tree = (source, pool.publish_tree(source))
+        spec = self._belt_tree[1]
+        parts = [leaves for leaves in np.array_split(units, len(pool.chunks)) if len(leaves)]
+        return pool.submit(_belt_acceleration_chunk, [(spec, back, leaves) for leaves in parts]), last
+    
+    def heliocentric(self, rows):
+        """Sun-relative positions from the last completed step."""
+        if isinstance(rows, slice) and (rows.start or 0) >= self.first_rock:
+            return self.pool.arrays["pos"][self.front][rows.start - self.first_rock:] - self.shown[0]
+        return self.shown[rows] - self.shown[0]
+    
+    def set_heliocentric(self, row, pos, velocity):
+        self.finish()
+        super().set_heliocentric(row, pos, velocity)
+        self.shown = self.pos.copy()
+
+def benchmark_gravity(counts=(1000, 10000, 100000), thetas=(0.5, 0.7, 1.0), samples=256, seed=0):
+    """Compare Barnes-Hut against direct summation on belt-shaped rock clouds.
+    
+    Direct summation is timed on `samples` targets and scaled to all N, and
+    the same targets give the tree's relative force error.
+    """
+    print(f"{'bodies':>8} {'theta':>6} {'direct s':>9} {'tree s':>8} {'speedup':>8} {'rms err':>8} {'max err':>8}")
+    for n in counts:
+        rng = np.random.default_rng(seed)
+        positions = AsteroidBelt(n, rng=rng).positions().astype(np.float64)
+        masses = np.full(n, 1.0 / n)
+        sample = rng.choice(n, size=min(samples, n), replace=False)
+        
+        start = time.perf_counter()
+        block = max(1, (1 << 22) // n)  # Bound the K x N x 3 temporaries
+        exact = np.concatenate([gravity_accelerations(positions[sample[i:i + block]], positions, masses)
+                                for i in range(0, len(sample), block)])
+        direct_time = (time.perf_counter() - start) * n / len(sample)
+        
+        for theta in thetas:
+            start = time.perf_counter()
+            approx = BarnesHutTree(positions, masses).accelerations(theta)[sample]
+            tree_time = time.perf_counter() - start
+            err = np.linalg.norm(approx - exact, axis=1) / np.linalg.norm(exact, axis=1)
+            print(f"{n:>8} {theta:>6.2f} {direct_time:>9.3f} {tree_time:>8.3f} "
+                  f"{direct_time / tree_time:>7.1f}x {np.sqrt(np.mean(err ** 2)):>8.4f} {err.max():>8.4f}")
+
+# -----------------------------------------------------------------------------
+# Classes
+# -----------------------------------------------------------------------------
+
+class Starfield:
+    """Background stars stored as contiguous float arrays.
+    
+    Twinkling is one batched NumPy pass per drawn frame, and draw() renders
+    every star with a single glDrawArrays call: positions live in a static
+    GPU buffer and only the colors are re-streamed. Under the star shader
+    the twinkle parameters are a static buffer too and nothing is streamed.
+    """
+    TWINKLE_PERIOD = 3600.0  # Seconds; every star twinkles a whole number of times per period
+    
+    def __init__(self, count=1000, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        self.count = count
+        self.positions = np.empty((count, 3), dtype=np.float32)
+        self.positions[:, 0] = rng.uniform(-100, 100, count)
+        self.positions[:, 1] = rng.uniform(-50, 50, count)
+        self.positions[:, 2] = rng.uniform(-100, 100, count)
+        self.base_brightness = rng.uniform(0.3, 1.0, count).astype(np.float32)  # Initial brightness
+        # How fast it twinkles, rounded to whole cycles per TWINKLE_PERIOD
+        cycles = np.round(rng.uniform(0.5, 3.0, count) * self.TWINKLE_PERIOD / (2 * np.pi))
+        self.twinkle_speed = (cycles * 2 * np.pi / self.TWINKLE_PERIOD).astype(np.float32)
+        self.twinkle_offset = rng.uniform(0, 6.28, count).astype(np.float32)  # Random phase offset
+        self.time = 0.0
+        
+        # White with variable brightness, one RGB triple per star
+        self.colors = np.repeat(self.base_brightness[:, np.newaxis], 3, axis=1)
+        self._colors_time = None  # Time self.colors were last evaluated at
+        self._buffers = None
+    
+    def update(self, dt):
+        """Advance the twinkle clock (brightness is evaluated when drawn)."""
+        # Wrap time to keep float32 phases precise over long sessions; every
+        # star is back at the same phase after TWINKLE_PERIOD, so nothing jumps
+        self.time = (self.time + dt) % self.TWINKLE_PERIOD
+    
+    def _update_colors(self):
+        """Evaluate star brightness at the current time for the fixed-function path."""
+        current_time = np.float32(self.time)
+        # Vary brightness using sine wave
+        twinkle = np.sin(current_time * self.twinkle_speed + self.twinkle_offset)
+        # Map -1 to 1 range to 0.4 to 1.0 of base brightness
+        self.colors[:] = (self.base_brightness * (0.7 + 0.3 * twinkle))[:, np.newaxis]
+        self._colors_time = self.time
+    
+    def draw(self):
+        if self._buffers is None:
+            self._buffers = {"position": GpuBuffer(self.positions)}
+        
+        gl_state.disable(GL_LIGHTING)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        self._buffers["position"].bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        
+        if shaders.active:
+            with shaders.program("stars") as program:
+                self._draw_twinkle_shader(program)
+        else:
+            if self._colors_time != self.time:
+                self._update_colors()
+                if "color" in self._buffers:
+                    self._buffers["color"].update(self.colors)
+            if "color" not in self._buffers:
+                self._buffers["color"] = GpuBuffer(self.colors, usage=GL_STREAM_DRAW)
+            glEnableClientState(GL_COLOR_ARRAY)
+            self._buffers["color"].bind()
+            glColorPointer(3, GL_FLOAT, 0, None)
+            glDrawArrays(GL_POINTS, 0, self.count)
+            glDisableClientState(GL_COLOR_ARRAY)
+        
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+    
+    def _draw_twinkle_shader(self, program):
+        if "twinkle" not in self._buffers:
+            params = np.stack([self.base_brightness, self.twinkle_speed, self.twinkle_offset], axis=1)
+            self._buffers["twinkle"] = GpuBuffer(params)
+        program.set("u_time", float(np.float32(self.time)))
+        location = program.attribute("a_twinkle")
+        glEnableVertexAttribArray(location)
+        self._buffers["twinkle"].bind()
+        glVertexAttribPointer(location, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glDrawArrays(GL_POINTS, 0, self.count)
+        glDisableVertexAttribArray(location)
+
+
+class AsteroidBelt:
+    """Asteroid belt between Mars and Jupiter with individually orbiting asteroids.
+    
+    Orbital state is stored as parallel NumPy arrays (one entry per rock),
+    so update() advances every angle in a single vectorized step and draw()
+    renders the whole belt with one glDrawElements call over a batched
+    low-poly rock mesh. This keeps belts of 50k+ rocks interactive.
+    """
+    def __init__(self, count=200, inner_radius=14.5, outer_radius=16.5, rng=None):
+        rng = rng if rng is not None else np.random.default_rng()
+        self.count = count
+        self.orbit_radius = rng.uniform(inner_radius, outer_radius, count)
+        self.orbit_angle = rng.uniform(0.0, 360.0, count)
+        self.start_angle = self.orbit_angle.copy()  # Angles at simulation time 0
+        self.orbit_speed = rng.uniform(15.0, 22.0, count)  # Between Mars and Jupiter speeds
+        self.size = rng.uniform(0.05, 0.15, count)
+        self.y_offset = rng.uniform(-0.3, 0.3, count)  # Slight vertical variation
+        self.render_lag = 0.0  # Simulated seconds the drawn belt trails the last step
+        self.nbody_positions = None  # Set while the N-body integrator owns the rocks
+        
+        # Draw buffers, built on first draw (needs a GL context)
+        self._buffers = None
+        self._centers = np.zeros((count, 3), dtype=np.float32)
+        self._positions = None
+        self._local = None
+        self.chunk_counts = [0, 0]  # Belt chunks drawn, total (last draw)
+        self.vertices = 0  # Vertices submitted by the last draw
+        self._order = None  # Rock in each buffer slot, grouped by sector (see plan_draw)
+        self._sprite_sectors = np.zeros(BELT_CULL_CHUNKS, dtype=bool)  # Sectors drawn as points
+    
+    def update(self, dt):
+        if state.paused or self.nbody_positions is not None:
+            return
+        adj_dt = dt * state.speed_multiplier
+        self.orbit_angle += self.orbit_speed * adj_dt
+        np.mod(self.orbit_angle, 360.0, out=self.orbit_angle)
+    
+    def seek(self, t):
+        """Set every rock to its closed-form angle at simulation time t."""
+        np.mod(self.start_angle + self.orbit_speed * t, 360.0, out=self.orbit_angle)
+        self.render_lag = 0.0
+    
+    def positions(self):
+        """Rock centres to draw (rewound by render_lag) as a (count, 3) float32 array."""
+        if self.nbody_positions is not None:
+            self._centers[:] = self.nbody_positions
+            return self._centers
+        angle = self.orbit_angle
+        if self.render_lag:
+            angle = angle - self.orbit_speed * self.render_lag
+        rad = np.radians(angle)
+        self._centers[:, 0] = np.cos(rad) * self.orbit_radius
+        self._centers[:, 1] = self.y_offset
+        self._centers[:, 2] = np.sin(rad) * self.orbit_radius
+        return self._centers
+    
+    def _build_buffers(self):
+        """Replicate the rock mesh per asteroid into static GPU buffers."""
+        verts, faces, uvs = ROCK_MESH
+        n_verts = len(verts)
+        
+        # Per-rock vertex offsets from its centre; only the centres move
+        self._local = (verts[np.newaxis] * self.size[:, np.newaxis, np.newaxis]).astype(np.float32)
+        self._positions = np.empty_like(self._local)
+        normals = np.broadcast_to(verts, self._local.shape)
+        texcoords = np.broadcast_to(uvs, (self.count,) + uvs.shape)
+        indices = faces[np.newaxis] + (np.arange(self.count, dtype=np.uint32) * n_verts)[:, np.newaxis, np.newaxis]
+        
+        self._buffers = {
+            "position": GpuBuffer(self._local, usage=GL_STREAM_DRAW),
+            "normal": GpuBuffer(normals.astype(np.float32)),
+            "texcoord": GpuBuffer(texcoords.astype(np.float32)),
+            "index": GpuBuffer(indices.astype(np.uint32), target=GL_ELEMENT_ARRAY_BUFFER),
+            "center": GpuBuffer(self._centers, usage=GL_STREAM_DRAW),  # Far sectors as points
+        }
+        self._index_count = indices.size
+    
+    RESORT_GROWTH = 1.5  # Regroup the belt once a sector's bound grows this much
+    
+    def _group_sectors(self, centers):
+        """Assign buffer slots so each angular sector's rocks are contiguous."""
+        chunks = BELT_CULL_CHUNKS
+        angle = np.arctan2(centers[:, 2], centers[:, 0]) + math.pi
+        sector = np.minimum(angle * (chunks / (2 * math.pi)), chunks - 1).astype(np.uint8)
+        self._order = np.argsort(sector, kind="stable")
+        bounds = np.searchsorted(sector[self._order], np.arange(chunks + 1))
+        filled = bounds[1:] > bounds[:-1]
+        self._chunks = (bounds[:-1][filled], bounds[1:][filled])
+        self._chunk_sectors = np.flatnonzero(filled)
+        self._local_grouped = self._local[self._order]
+        self._size_grouped = self.size[self._order]
+        self._chunk_max_size = np.maximum.reduceat(self._size_grouped, self._chunks[0])
+        self._grouped_radius = None
+    
+    def plan_draw(self, camera, cull=True):
+        """Split the belt into sector ranges to draw as meshes and as points.
+        
+        Rocks are kept in buffer slots grouped by angular sector, so each
+        sector is a contiguous run whose bounding sphere is measured from
+        its rocks every frame. Rocks drift apart at different orbit speeds,
+        so the grouping is redone once the bounds have grown by
+        RESORT_GROWTH. Sectors outside the frustum are dropped (with cull),
+        and sectors whose biggest rock would be under SPRITE_PIXEL_RADIUS
+        even at the sector's near edge become points (with hysteresis).
+        Returns (mesh ranges, [(start, end, point size)]) in slots, after
+        writing the mesh sectors' vertex positions.
+        """
+        centers = self.positions()
+        if self._order is None:
+            self._group_sectors(centers)
+        centers = centers[self._order]
+        self._grouped_centers = centers
+        
+        starts, ends = self._chunks
+        middles = np.add.reduceat(centers, starts) / (ends - starts)[:, np.newaxis]
+        spread = np.linalg.norm(centers - np.repeat(middles, ends - starts, axis=0), axis=1)
+        radii = np.maximum.reduceat(spread + self._size_grouped, starts)
+        if self._grouped_radius is None:
+            self._grouped_radius = radii.max()
+        elif radii.max() > self.RESORT_GROWTH * self._grouped_radius:
+            self._order = None
+        
+        visible = camera.visible(middles, radii) if cull else np.ones(len(starts), dtype=bool)
+        self.chunk_counts = [int(visible.sum()), len(visible)]
+        
+        near = np.maximum(np.linalg.norm(middles - np.asarray(camera.eye), axis=1) - radii, 1e-6)
+        pixels = self._chunk_max_size * camera.pixels_per_unit() / near
+        was_sprite = self._sprite_sectors[self._chunk_sectors]
+        sprite = pixels < SPRITE_PIXEL_RADIUS * np.where(was_sprite, 1.0 + LOD_HYSTERESIS, 1.0 - LOD_HYSTERESIS)
+        self._sprite_sectors[self._chunk_sectors] = sprite
+        
+        meshes = []
+        for start, end in zip(starts[visible & ~sprite].tolist(), ends[visible & ~sprite].tolist()):
+            if meshes and meshes[-1][1] == start:
+                meshes[-1] = (meshes[-1][0], end)  # Neighbouring sectors: one draw
+            else:
+                meshes.append((start, end))
+        sprites = [(start, end, max(1.0, 2.0 * px)) for start, end, px in
+                   zip(starts[visible & sprite].tolist(), ends[visible & sprite].tolist(),
+                       pixels[visible & sprite].tolist())]
+        
+        # Move the drawn rocks' vertices to their centres
+        for start, end in meshes:
+            np.add(self._local_grouped[start:end], centers[start:end, np.newaxis, :],
+                   out=self._positions[start:end])
+        return meshes, sprites
+    
+    def submit(self, queue, camera, cull=True):
+        """Queue the belt as seen from camera (only the sectors it can see, with cull).
+        
+        Rock meshes are opaque; far sectors drawn as points go in the
+        ordered pass with the other sprites.
+        """
+        self.vertices = 0
+        if state.planets_hidden or self.count == 0:
+            self.chunk_counts = [0, 0]
+            return
+        if self._buffers is None:
+            self._build_buffers()
+        
+        meshes, sprites = self.plan_draw(camera, cull)
+        if meshes:
+            queue.submit(PASS_OPAQUE, lambda: self.draw_meshes(meshes), "draw.asteroids",
+                         texture=planet_textures.get("Asteroid", 0), at=(0.0, 0.0, 0.0))
+        if sprites:
+            queue.submit(PASS_ORDERED, lambda: self.draw_sprites(sprites), "draw.asteroids")
+    
+    def draw_meshes(self, meshes):
+        """Upload and draw the rocks in the (start, end) ranges from plan_draw."""
+        vertex_bytes = self._positions[0].nbytes
+        for start, end in meshes:
+            self._buffers["position"].update(self._positions[start:end], offset=start * vertex_bytes)
+            self.vertices += (end - start) * len(ROCK_MESH[0])
+        
+        gl_state.disable(GL_LIGHTING)
+        
+        # Use texture if available
+        use_texture = "Asteroid" in planet_textures
         if use_texture:
-            glDisable(GL_TEXTURE_2D)
+            gl_state.enable(GL_TEXTURE_2D)
+            gl_state.bind_texture(GL_TEXTURE_2D, planet_textures["Asteroid"])
+            glColor3f(1.0, 1.0, 1.0)
+        else:
+            glColor3f(0.5, 0.45, 0.4)  # Grey-brown asteroid color
+        
+        glEnableClientState(GL_VERTEX_ARRAY)
+        self._buffers["position"].bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        self._buffers["normal"].bind()
+        glNormalPointer(GL_FLOAT, 0, None)
+        if use_texture:
+            glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+            self._buffers["texcoord"].bind()
+            glTexCoordPointer(2, GL_FLOAT, 0, None)
+        
+        self._buffers["index"].bind()
+        per_rock = self._index_count // self.count
+        for start, end in meshes:
+            glDrawElements(GL_TRIANGLES, (end - start) * per_rock, GL_UNSIGNED_INT,
+                           ctypes.c_void_p(start * per_rock * 4))
+        
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        
+        if use_texture:
+            gl_state.disable(GL_TEXTURE_2D)
         
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
+    
+    def draw_sprites(self, sprites):
+        """Draw far sectors as one round point per rock."""
+        self._buffers["center"].update(self._grouped_centers)
+        gl_state.disable(GL_LIGHTING)
+        gl_state.enable(GL_POINT_SMOOTH)
+        gl_state.enable(GL_BLEND)
+        gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glColor3f(0.5, 0.45, 0.4)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        self._buffers["center"].bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        for start, end, size in sprites:
+            glPointSize(size)
+            glDrawArrays(GL_POINTS, start, end - start)
+            self.vertices += end - start
+        glPointSize(1.0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        gl_state.disable(GL_BLEND)
+        gl_state.disable(GL_POINT_SMOOTH)
 
 
 class Spacecraft:
@@ -1361,7 +3609,7 @@ class Spacecraft:
     
     def _draw_model(self):
         """Draw a simple spacecraft: cone nose + cylinder body."""
-        glDisable(GL_LIGHTING)
+        gl_state.disable(GL_LIGHTING)
         
         glPushMatrix()
         glTranslatef(self.pos[0], self.pos[1], self.pos[2])
@@ -1370,23 +3618,21 @@ class Spacecraft:
         
         # Body (cylinder) - silver/grey
         glColor3f(0.7, 0.7, 0.8)
-        quad = gluNewQuadric()
-        gluCylinder(quad, 0.15, 0.15, 0.6, 12, 1)
+        gluCylinder(mesh_cache.get_quadric(), 0.15, 0.15, 0.6, 12, 1)
         
         # Nose (cone) - white
         glColor3f(1.0, 1.0, 1.0)
         glTranslatef(0, 0, -0.3)
-        glutSolidCone(0.15, 0.3, 12, 1)
+        gluCylinder(mesh_cache.get_quadric(), 0.15, 0.0, 0.3, 12, 1)
+        gluDisk(mesh_cache.get_quadric(), 0.0, 0.15, 12, 1)
         
         # Engine glow (small sphere at back) - blue
         glTranslatef(0, 0, 0.9)
         glColor3f(0.3, 0.5, 1.0)
-        glutSolidSphere(0.1, 8, 8)
+        mesh_cache.draw_sphere(0.1, 8, 8)
         
         glPopMatrix()
         
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
 
 class Camera:
     def __init__(self):
@@ -1424,6 +3670,65 @@ class Camera:
         
         # Note: CAM_SPACECRAFT is handled separately in update_spacecraft_camera
 
+    def pixels_per_unit(self):
+        """On-screen pixels covered by one world unit at distance 1 (times distance)."""
+        return viewport_size[1] / 2 / math.tan(math.radians(CAMERA_FOV) / 2)
+
+    def projected_radius(self, pos, radius):
+        """Approximate on-screen radius in pixels of a sphere seen from the eye."""
+        dist = math.dist(self.eye, pos)
+        if dist <= radius:
+            return float(viewport_size[1])
+        return radius / dist * self.pixels_per_unit()
+
+    def view_rotation(self):
+        """Rows of the gluLookAt rotation: side, up and back axes."""
+        f = np.subtract(self.center, self.eye, dtype=np.float64)
+        f /= np.linalg.norm(f)
+        side = np.cross(f, self.up)
+        side /= np.linalg.norm(side)
+        return np.array([side, np.cross(side, f), -f])
+    
+    def to_eye(self, positions):
+        """Eye-space coordinates of (N, 3) world positions, as gluLookAt maps them."""
+        return np.subtract(positions, self.eye) @ self.view_rotation().T
+
+    def frustum_planes(self):
+        """Eye-space planes (a, b, c, d) of the reshape() projection; inside is >= 0."""
+        tan_y = math.tan(math.radians(CAMERA_FOV) / 2)
+        tan_x = tan_y * viewport_size[0] / viewport_size[1]
+        planes = np.array([
+            [1.0, 0.0, -tan_x, 0.0], [-1.0, 0.0, -tan_x, 0.0],  # Left, right
+            [0.0, 1.0, -tan_y, 0.0], [0.0, -1.0, -tan_y, 0.0],  # Bottom, top
+            [0.0, 0.0, -1.0, -CAMERA_NEAR], [0.0, 0.0, 1.0, CAMERA_FAR],
+        ])
+        planes[:4] /= np.linalg.norm(planes[:4, :3], axis=1)[:, np.newaxis]
+        return planes
+    
+    def visible(self, centers, radii):
+        """Mask of (N, 3) world-space spheres that are at least partly in the view frustum."""
+        planes = self.frustum_planes()
+        dist = self.to_eye(centers) @ planes[:, :3].T + planes[:, 3]
+        return np.all(dist >= -np.asarray(radii, dtype=np.float64)[:, np.newaxis], axis=1)
+    
+    def occluded(self, centers, radii, occluder=(0.0, 0.0, 0.0), occluder_radius=2.0):
+        """Mask of spheres wholly hidden behind an opaque sphere (by default the Sun).
+        
+        A sphere is hidden when it lies further away than the occluder's
+        centre and its angular disc fits inside the occluder's.
+        """
+        to_occluder = np.subtract(occluder, self.eye)
+        occluder_dist = np.linalg.norm(to_occluder)
+        if occluder_dist <= occluder_radius:
+            return np.zeros(len(centers), dtype=bool)
+        offsets = np.subtract(centers, self.eye)
+        dist = np.maximum(np.linalg.norm(offsets, axis=1), 1e-9)
+        radii = np.asarray(radii, dtype=np.float64)
+        cos_sep = np.clip(offsets @ to_occluder / (dist * occluder_dist), -1.0, 1.0)
+        half_angle = np.arcsin(np.clip(radii / dist, 0.0, 1.0))
+        return ((dist - radii > occluder_dist) &
+                (np.arccos(cos_sep) + half_angle < math.asin(occluder_radius / occluder_dist)))
+
     def apply(self):
         gluLookAt(
             self.eye[0], self.eye[1], self.eye[2],
@@ -1431,9 +3736,153 @@ class Camera:
             self.up[0], self.up[1], self.up[2]
         )
 
+class TrailBuffer:
+    """Fixed-capacity circular buffer of trail points mirrored in a GPU buffer.
+    
+    append() overwrites the oldest slot in O(1); draw() uploads only the
+    slots written since the last frame and draws the trail as one line strip.
+    The GPU buffer holds the ring twice (vertex j mirrors slot j mod
+    capacity), so any run of the ring is one contiguous vertex range. The
+    fade is done on the GPU: vertex j has the fixed texture coordinate
+    j / capacity and the texture matrix (or the trail shader) maps it to
+    the point's age along a 1D alpha ramp, so longer trails add no
+    per-point Python work.
+    """
+    _fade_texture = None
+    
+    def __init__(self, capacity=TRAIL_LENGTH):
+        self.capacity = capacity
+        self.points = np.zeros((capacity, 3), dtype=np.float32)
+        self.head = 0   # Slot the next point is written to
+        self.count = 0  # Valid points (oldest at head - count)
+        self._dirty_start = 0
+        self._dirty_count = 0
+        self._buffers = None
+    
+    def __len__(self):
+        return self.count
+    
+    def append(self, pos):
+        self.points[self.head] = pos
+        if self._dirty_count == 0:
+            self._dirty_start = self.head
+        self._dirty_count = min(self._dirty_count + 1, self.capacity)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self._dirty_count = 0
+    
+    def reset(self, points):
+        """Replace the trail with points (oldest first), keeping the newest capacity."""
+        points = np.asarray(points, dtype=np.float32)[-self.capacity:]
+        n = len(points)
+        self.points[:n] = points
+        self.head = n % self.capacity
+        self.count = n
+        self._dirty_start = 0
+        self._dirty_count = n
+    
+    @classmethod
+    def fade_texture(cls):
+        """Shared 1D alpha ramp (0 at the oldest point, 1 at the newest)."""
+        if cls._fade_texture is None:
+            ramp = np.linspace(0.0, 255.0, 256).astype(np.uint8)
+            cls._fade_texture = glGenTextures(1)
+            gl_state.bind_texture(GL_TEXTURE_1D, cls._fade_texture)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            glTexImage1D(GL_TEXTURE_1D, 0, GL_ALPHA, len(ramp), 0, GL_ALPHA, GL_UNSIGNED_BYTE, ramp)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        return cls._fade_texture
+    
+    def _sync(self):
+        """Stream the slots written since the last draw into both ring copies."""
+        if self._buffers is None:
+            vertices = np.arange(2 * self.capacity)
+            self._buffers = {
+                "position": GpuBuffer(np.concatenate([self.points, self.points]), usage=GL_DYNAMIC_DRAW),
+                "texcoord": GpuBuffer((vertices / self.capacity).astype(np.float32)),
+            }
+            self._dirty_count = 0
+            return
+        
+        start, n = self._dirty_start, self._dirty_count
+        first = min(n, self.capacity - start)
+        ranges = [(start, self.points[start:start + first])]
+        if n > first:
+            ranges.append((0, self.points[:n - first]))
+        for slot, points in ranges:
+            for copy in (slot, slot + self.capacity):
+                self._buffers["position"].update(points, offset=copy * points.itemsize * 3)
+        self._dirty_count = 0
+    
+    def draw(self, color, alpha=0.7, lead=None):
+        """Draw oldest to newest, fading from transparent to color * alpha.
+        
+        lead, if given, is a point the newest one is joined to at full alpha.
+        """
+        if self.count < 2:
+            return
+        self._sync()
+        start = (self.head - self.count) % self.capacity
+        glColor4f(color[0], color[1], color[2], alpha)
+        if shaders.active:
+            with shaders.program("trail") as program:
+                program.set("u_ring", float(start), float(self.count), float(self.capacity))
+                self._draw_vertices(start, lead)
+            return
+        
+        # Vertex j (j in start..start+count-1) has texture coordinate
+        # j / capacity; map it to its age (j - start) / count, offset half a
+        # step so the ends stay clear of the ramp's edges.
+        glMatrixMode(GL_TEXTURE)
+        glLoadIdentity()
+        glTranslatef(0.5 / self.count, 0.0, 0.0)
+        glScalef(self.capacity / self.count, 1.0, 1.0)
+        glTranslatef(-start / self.capacity, 0.0, 0.0)
+        glMatrixMode(GL_MODELVIEW)
+        
+        gl_state.enable(GL_TEXTURE_1D)
+        gl_state.bind_texture(GL_TEXTURE_1D, self.fade_texture())
+        self._draw_vertices(start, lead)
+        gl_state.disable(GL_TEXTURE_1D)
+        
+        glMatrixMode(GL_TEXTURE)
+        glLoadIdentity()
+        glMatrixMode(GL_MODELVIEW)
+    
+    def _draw_vertices(self, start, lead):
+        glEnableClientState(GL_VERTEX_ARRAY)
+        self._buffers["position"].bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        self._buffers["texcoord"].bind()
+        glTexCoordPointer(1, GL_FLOAT, 0, None)
+        glDrawArrays(GL_LINE_STRIP, start, self.count)
+        
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        
+        if lead is not None:
+            # One past the newest vertex, so its age clamps to 1
+            glTexCoord1f((start + self.count) / self.capacity)
+            glBegin(GL_LINES)
+            glVertex3f(*self.newest())
+            glVertex3f(*lead)
+            glEnd()
+    
+    def newest(self):
+        return self.points[(self.head - 1) % self.capacity]
+
 class Planet:
     def __init__(self, name, radius, orbit_radius, orbit_speed, rotation_speed, color,
-                 has_ring=False, ring_inner=0, ring_outer=0, ring_color=(1,1,1,0.5), ring_tilt=0):
+                 has_ring=False, ring_inner=0, ring_outer=0, ring_color=(1,1,1,0.5), ring_tilt=0,
+                 rng=None, trail_length=TRAIL_LENGTH):
         self.name = name
         self.radius = radius
         self.orbit_radius = orbit_radius
@@ -1448,21 +3897,31 @@ class Planet:
         self.ring_color = ring_color  # RGBA for transparency
         self.ring_tilt = ring_tilt  # Tilt angle in degrees (0 = flat, 90 = vertical)
         
-        self.orbit_angle = random.uniform(0, 360) # Random start pos
+        rng = rng if rng is not None else np.random.default_rng()
+        self.orbit_angle = float(rng.uniform(0, 360)) # Random start pos
+        self.start_angle = self.orbit_angle  # Orbit angle at simulation time 0
         self.rotation_angle = 0.0
         
         self.world_pos = [orbit_radius, 0.0, 0.0]
+        # Position at the previous step, and the blend of the two that is drawn
+        self.prev_pos = list(self.world_pos)
+        self.prev_rotation = 0.0
+        self.render_pos = list(self.world_pos)
+        self.render_rotation = 0.0
         self.velocity_drift = [0.0, 0.0, 0.0]
         self.drifting_pos = [0.0, 0.0, 0.0] # used when gravity off
         self.was_gravity_on = True
         
         # Orbit trail tracking
-        self.trail_history = []  # List of past positions
-        self.trail_max_length = 100  # Number of trail points to keep
+        self.trail_max_length = trail_length  # Number of trail points to keep
+        self.trail = TrailBuffer(self.trail_max_length)  # Ring of past positions
         self.trail_update_interval = 0.05  # Seconds between trail updates
         self.trail_timer = 0.0
+        self.lod = SphereLod()
 
     def update(self, dt):
+        self.prev_pos = list(self.world_pos)
+        self.prev_rotation = self.rotation_angle
         if state.paused:
             return
 
@@ -1471,8 +3930,11 @@ class Planet:
         # Self Rotation (always happens)
         self.rotation_angle += self.rotation_speed * adj_dt
         if self.rotation_angle >= 360.0: self.rotation_angle -= 360.0
+        elif self.rotation_angle < 0.0: self.rotation_angle += 360.0  # Running backwards
         
-        if state.gravity_enabled:
+        if state.nbody_enabled:
+            pass  # Position is integrated by SolarSystem.nbody
+        elif state.gravity_enabled:
             # Check if we just switched ON
             if not self.was_gravity_on:
                 # Restoration logic: Just snap back to orbit calculations
@@ -1518,24 +3980,57 @@ class Planet:
         self.trail_timer += adj_dt
         if self.trail_timer >= self.trail_update_interval:
             self.trail_timer = 0.0
-            self.trail_history.append(list(self.world_pos))
-            if len(self.trail_history) > self.trail_max_length:
-                self.trail_history.pop(0)
+            self.trail.append(self.world_pos)
+
+    def orbit_angle_at(self, t):
+        """Orbit angle in degrees at simulation time t (scalar or array)."""
+        return np.mod(self.start_angle + self.orbit_speed * np.asarray(t, dtype=np.float64), 360.0)
+
+    def positions_at(self, t):
+        """Positions on the circular orbit at time(s) t, shape t.shape + (3,)."""
+        rad = np.radians(self.orbit_angle_at(t))
+        return np.stack([np.cos(rad) * self.orbit_radius, np.zeros_like(rad),
+                         np.sin(rad) * self.orbit_radius], axis=-1)
+
+    def seek(self, t):
+        """Jump to simulation time t on the closed-form orbit (gravity on)."""
+        self.orbit_angle = float(self.orbit_angle_at(t))
+        self.rotation_angle = float(np.mod(self.rotation_speed * t, 360.0))
+        self.world_pos = self.positions_at(t).tolist()
+        self.was_gravity_on = True  # A drift restarts from here
+        self.prev_pos = list(self.world_pos)
+        self.prev_rotation = self.rotation_angle
+        self.interpolate(1.0)
+        
+        # Refill the trail with where the planet was leading up to t
+        n = min(self.trail_max_length, int(max(t, 0.0) / self.trail_update_interval) + 1)
+        times = t - self.trail_update_interval * np.arange(n - 1, -1, -1)
+        self.trail.reset(self.positions_at(times))
+        self.trail_timer = 0.0
+
+    def interpolate(self, alpha):
+        """Set the drawn position/spin alpha of the way from the previous step."""
+        self.render_pos = [a + (b - a) * alpha for a, b in zip(self.prev_pos, self.world_pos)]
+        # Shortest way round, so a wrap past 360 (or 0, running backwards) isn't a full turn
+        spin = (self.rotation_angle - self.prev_rotation + 180.0) % 360.0 - 180.0
+        self.render_rotation = self.prev_rotation + spin * alpha
 
     def draw_orbit(self):
-        if not state.show_orbits: return
-            
-        glDisable(GL_LIGHTING)
+        gl_state.disable(GL_LIGHTING)
         glColor3f(0.15, 0.15, 0.15)
-        glBegin(GL_LINE_LOOP)
-        segments = 64
-        for i in range(segments):
-            theta = 2.0 * math.pi * i / segments
-            x = self.orbit_radius * math.cos(theta)
-            z = self.orbit_radius * math.sin(theta)
-            glVertex3f(x, 0.0, z)
-        glEnd()
-        if state.lighting_enabled: glEnable(GL_LIGHTING)
+        self.orbit_geometry().draw()
+
+    @property
+    def bound_radius(self):
+        """Radius of a sphere around the planet, its ring and selection highlight."""
+        return max(self.radius * 1.3, self.ring_outer if self.has_ring else 0.0)
+
+    def orbit_geometry(self):
+        return geometry_registry.get(f"orbit:{self.name}", (self.orbit_radius,), orbit_geometry)
+
+    def ring_geometry(self):
+        params = (self.ring_inner, self.ring_outer, tuple(self.ring_color))
+        return geometry_registry.get(f"ring:{self.name}", params, ring_geometry)
 
     def draw_ring(self):
         """Draw planetary ring with transparency and tilt."""
@@ -1543,160 +4038,142 @@ class Planet:
             return
         
         glPushMatrix()
+        glTranslatef(self.render_pos[0], self.render_pos[1], self.render_pos[2])
         
         # Apply ring tilt (e.g., Uranus has ~90 degree tilt)
         if self.ring_tilt != 0:
             glRotatef(self.ring_tilt, 1.0, 0.0, 0.0)  # Tilt around X axis
         
-        glDisable(GL_LIGHTING)
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        
-        # Draw ring as triangle strip
-        segments = 64
-        glBegin(GL_TRIANGLE_STRIP)
-        for i in range(segments + 1):
-            theta = 2.0 * math.pi * i / segments
-            cos_t = math.cos(theta)
-            sin_t = math.sin(theta)
-            
-            # Outer edge
-            glColor4f(*self.ring_color)
-            glVertex3f(cos_t * self.ring_outer, 0.0, sin_t * self.ring_outer)
-            
-            # Inner edge (slightly more transparent)
-            inner_color = (self.ring_color[0], self.ring_color[1], self.ring_color[2], self.ring_color[3] * 0.7)
-            glColor4f(*inner_color)
-            glVertex3f(cos_t * self.ring_inner, 0.0, sin_t * self.ring_inner)
-        glEnd()
+        gl_state.disable(GL_LIGHTING)
+        gl_state.enable(GL_BLEND)
+        gl_state.blend_func(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
         
-        glDisable(GL_BLEND)
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
+        # Draw ring as triangle strip (baked with its colors)
+        self.ring_geometry().draw()
+        
+        gl_state.disable(GL_BLEND)
         
         glPopMatrix()
 
-    def draw(self, is_selected):
+    def submit(self, queue, is_selected, visible=True):
+        """Queue orbit, body, ring and trail draws; visible=False (culled) skips the body itself."""
         if state.planets_hidden: return
+        scope = "draw." + self.name
 
         # Draw Orbit Path only if gravity is ON (otherwise it's confusing)
-        if state.gravity_enabled:
-            self.draw_orbit()
-        
-        glPushMatrix()
-        glTranslatef(self.world_pos[0], self.world_pos[1], self.world_pos[2])
+        if state.gravity_enabled and state.show_orbits:
+            queue.submit(PASS_ORDERED, self.draw_orbit, scope)
         
-        # Highlight
-        if is_selected:
-            glDisable(GL_LIGHTING)
-            glColor3f(1.0, 1.0, 1.0)
-            glutWireSphere(self.radius * 1.3, 8, 8)
-            if state.lighting_enabled: glEnable(GL_LIGHTING)
+        if visible:
+            if is_selected:
+                queue.submit(PASS_ORDERED, self.draw_highlight, scope)
+            pixel_radius = solar_system.camera.projected_radius(self.render_pos, self.radius)
+            mesh = self.lod.select(pixel_radius)
+            if mesh is None:
+                # Too small to make out a ring or texture
+                queue.submit(PASS_ORDERED, lambda: self.draw_sprite(pixel_radius), scope)
+            else:
+                texture_id = lod_texture(self.name, pixel_radius)
+                queue.submit(PASS_OPAQUE, lambda: self.draw_body(mesh, texture_id), scope,
+                             program=shaders.program_id("planet"), texture=texture_id or 0, at=self.render_pos)
+                if self.has_ring:
+                    queue.submit(PASS_ORDERED, self.draw_ring, scope)
         
-        # Draw Ring BEFORE rotation (rings stay flat in orbital plane)
-        self.draw_ring()
+        if len(self.trail) >= 2:
+            queue.submit(PASS_ORDERED, self.draw_trail, scope, program=shaders.program_id("trail"))
+    
+    def draw_highlight(self):
+        glPushMatrix()
+        glTranslatef(self.render_pos[0], self.render_pos[1], self.render_pos[2])
+        gl_state.disable(GL_LIGHTING)
+        glColor3f(1.0, 1.0, 1.0)
+        mesh_cache.draw_sphere(self.radius * 1.3, 8, 8, wire=True)
+        glPopMatrix()
+    
+    def draw_sprite(self, pixel_radius):
+        glPushMatrix()
+        glTranslatef(self.render_pos[0], self.render_pos[1], self.render_pos[2])
+        draw_point_sprite(self.color, pixel_radius)
+        glPopMatrix()
+    
+    def draw_body(self, mesh, texture_id):
+        """Draw the sphere at mesh (slices, stacks), textured unless texture_id is None."""
+        glPushMatrix()
+        glTranslatef(self.render_pos[0], self.render_pos[1], self.render_pos[2])
         
         # Rotate for planet texture/surface
-        glRotatef(self.rotation_angle, 0.0, 1.0, 0.0)
+        glRotatef(self.render_rotation, 0.0, 1.0, 0.0)
         
         # Draw Planet with texture
-        if self.name in planet_textures:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, planet_textures[self.name])
+        gl_state.apply_lighting()
+        if shaders.active:
+            with shaders.program("planet") as program:
+                program.set("u_textured", 0.0 if texture_id is None else 1.0)
+                if texture_id is not None:
+                    gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+                glColor3f(*((1.0, 1.0, 1.0) if texture_id is not None else self.color))
+                mesh_cache.draw_sphere(self.radius, *mesh)
+        elif texture_id is not None:
+            gl_state.enable(GL_TEXTURE_2D)
+            gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
             glColor3f(1.0, 1.0, 1.0)  # Full brightness for textured surface
-            
-            quadric = gluNewQuadric()
-            gluQuadricTexture(quadric, GL_TRUE)
-            gluQuadricNormals(quadric, GLU_SMOOTH)
-            gluSphere(quadric, self.radius, 32, 32)
-            gluDeleteQuadric(quadric)
-            
-            glDisable(GL_TEXTURE_2D)
+            mesh_cache.draw_sphere(self.radius, *mesh)
+            gl_state.disable(GL_TEXTURE_2D)
         else:
             # Fallback to solid color
             glColor3f(*self.color)
-            gluSphere(gluNewQuadric(), self.radius, 32, 32)
+            mesh_cache.draw_sphere(self.radius, *mesh)
         
         glPopMatrix()
-        
-        # Draw trail after planet (not affected by planet's matrix)
-        self.draw_trail()
-        
-        # Draw label above planet
-        self.draw_label()
     
     def draw_trail(self):
         """Draw fading orbit trail behind planet."""
-        if len(self.trail_history) < 2:
+        if len(self.trail) < 2:
             return
         
-        glDisable(GL_LIGHTING)
-        glEnable(GL_BLEND)
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        
-        glBegin(GL_LINE_STRIP)
-        for i, pos in enumerate(self.trail_history):
-            # Fade from transparent (old) to planet color (new)
-            alpha = i / len(self.trail_history)  # 0.0 (old) to 1.0 (new)
-            glColor4f(self.color[0], self.color[1], self.color[2], alpha * 0.7)
-            glVertex3f(pos[0], pos[1], pos[2])
-        # Connect to current position
-        glColor4f(self.color[0], self.color[1], self.color[2], 0.7)
-        glVertex3f(self.world_pos[0], self.world_pos[1], self.world_pos[2])
-        glEnd()
+        gl_state.disable(GL_LIGHTING)
+        gl_state.enable(GL_BLEND)
+        # The shader path blends trails additively, so crossings glow
+        gl_state.blend_func(GL_SRC_ALPHA, GL_ONE if shaders.active else GL_ONE_MINUS_SRC_ALPHA)
         
-        glDisable(GL_BLEND)
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
-    
-    def draw_label(self):
-        """Draw planet name label above the planet."""
-        # Project 3D position to get label position
-        label_y_offset = self.radius + 0.5  # Above planet
-        
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)  # Labels always visible
-        glColor3f(1.0, 1.0, 1.0)
-        
-        glPushMatrix()
-        glTranslatef(self.world_pos[0], self.world_pos[1] + label_y_offset, self.world_pos[2])
-        
-        # Billboard - face the camera
-        # Get modelview matrix and extract rotation to cancel it
-        modelview = glGetFloatv(GL_MODELVIEW_MATRIX)
-        # Reset rotation part (first 3x3) to identity but keep translation
-        for i in range(3):
-            for j in range(3):
-                if i == j:
-                    modelview[i][j] = 1.0
-                else:
-                    modelview[i][j] = 0.0
-        glLoadMatrixf(modelview)
+        # Fade from transparent (old) to planet color (new), then connect
+        # to the current position
+        self.trail.draw(self.color, 0.7, lead=self.render_pos)
         
-        # Scale text
-        glScalef(0.004, 0.004, 0.004)
-        
-        # Draw each character
-        for char in self.name:
-            glutStrokeCharacter(GLUT_STROKE_ROMAN, ord(char))
-        
-        glPopMatrix()
-        
-        glEnable(GL_DEPTH_TEST)
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
+        gl_state.disable(GL_BLEND)
 
 class SolarSystem:
-    def __init__(self):
+    def __init__(self, asteroid_count=ASTEROID_COUNT, star_count=STAR_COUNT, seed=RANDOM_SEED,
+                 asteroid_mass=NBODY_ASTEROID_MASS, physics_workers=PHYSICS_WORKERS,
+                 trail_length=TRAIL_LENGTH):
+        self.rng = np.random.default_rng(seed)  # One stream, so a seed fixes the whole scene
         self.planets = []
         self.camera = Camera()
-        self.stars = Starfield()
-        self.asteroid_belt = AsteroidBelt()  # Asteroid belt between Mars and Jupiter
+        self.stars = Starfield(star_count, rng=self.rng)
+        self.asteroid_belt = AsteroidBelt(asteroid_count, rng=self.rng)  # Asteroid belt between Mars and Jupiter
         self.spacecraft = Spacecraft()  # Player spacecraft
         self.last_time = get_time()
-        self._init_bodies()
+        self.sim_time = 0.0  # Scaled (speed_multiplier) seconds the orbits have run
+        self.nbody = None  # NBodySystem while N-body gravity is on
+        self.ship_piloted = False  # Spacecraft mode was on at the last N-body step
+        self.asteroid_mass = asteroid_mass  # Per-rock mass in N-body mode (solar masses)
+        self.physics_workers = physics_workers
+        self.physics_pool = None  # PhysicsWorkerPool, made on first use
+        self.body_visible = None  # Sun, planets, spacecraft: drawn this frame (see cull)
+        self.cull_counts = {}  # Category -> [drawn, total] for the last frame
+        self.vertex_counts = {}  # Category -> vertices submitted in the last frame
+        self.sun_lod = SphereLod()
+        self.render_queue = RenderQueue()
+        self._init_bodies(trail_length)
 
-    def _init_bodies(self):
+    def bake_geometry(self):
+        """Build the static orbit and ring buffers up front (needs a GL context)."""
+        for p in self.planets:
+            p.orbit_geometry()
+            if p.has_ring:
+                p.ring_geometry()
+
+    def _init_bodies(self, trail_length=TRAIL_LENGTH):
         # Planet data: name, radius, orbit_radius, orbit_speed, rotation_speed, color,
         #              has_ring, ring_inner, ring_outer, ring_color (RGBA)
         data = [
@@ -1715,28 +4192,141 @@ class SolarSystem:
         ]
         
         for p in data:
-            self.planets.append(Planet(*p))
+            self.planets.append(Planet(*p, rng=self.rng, trail_length=trail_length))
 
-    def update(self):
+    def update(self, dt=None):
+        """Advance by dt seconds (default: wall-clock time since the last update).
+        
+        Variable-step convenience wrapper; the main loop uses
+        advance_simulation(), which runs step() at the fixed SIM_TIMESTEP.
+        """
         current_time = get_time()
-        dt = current_time - self.last_time
+        if dt is None:
+            dt = current_time - self.last_time
         self.last_time = current_time
         
+        self.step(dt)
+        self.interpolate(1.0)
+        self.update_camera()
+
+    def step(self, dt):
+        """Advance the physics by one step of dt seconds."""
+        with profiler.scope("update"):
+            self._step(dt)
+
+    def _step(self, dt):
+        if not state.paused:
+            self.sim_time += dt * state.speed_multiplier
+        
         for p in self.planets:
-            p.update(dt)
+            with profiler.scope("update." + p.name):
+                p.update(dt)
         
         # Update asteroid belt
-        self.asteroid_belt.update(dt)
+        with profiler.scope("update.asteroids"):
+            self.asteroid_belt.update(dt)
         
         # Update spacecraft
-        self.spacecraft.update(dt)
+        with profiler.scope("update.spacecraft"):
+            self.spacecraft.update(dt)
         
         # Update twinkling stars
-        self.stars.update(dt)
-            
+        with profiler.scope("update.stars"):
+            self.stars.update(dt)
+        
+        # Real gravity moves the bodies after their scripted updates
+        if state.nbody_enabled:
+            with profiler.scope("update.nbody"):
+                self._step_nbody(dt)
+        elif self.nbody is not None:
+            # Back to scripted orbits (or drift) from the bodies' orbit angles
+            self.stop_nbody()
+
+    def stop_nbody(self):
+        """Drop the N-body state (after any step still in flight)."""
+        if self.nbody is not None:
+            self.nbody.finish()
+        self.nbody = None
+        self.asteroid_belt.nbody_positions = None
+
+    def close(self):
+        """Release the physics worker pool and its shared memory."""
+        self.stop_nbody()
+        if self.physics_pool is not None:
+            self.physics_pool.close()
+            self.physics_pool = None
+
+    def _start_nbody(self):
+        count = self.asteroid_belt.count
+        if self.physics_workers <= 0 or not NBODY_ASTEROIDS or count == 0:
+            return NBodySystem.from_system(self)
+        if self.physics_pool is None:
+            self.physics_pool = PhysicsWorkerPool(self.physics_workers, count, len(self.planets) + 1)
+            atexit.register(self.close)
+            print(f"Stepping {count} asteroids in {self.physics_workers} physics workers")
+        return ParallelNBodySystem.from_system(self, pool=self.physics_pool)
+
+    def _step_nbody(self, dt):
+        if self.nbody is None:
+            self.nbody = self._start_nbody()
+        nbody = self.nbody
+        ship_row = len(self.planets) + 1
+        ship = self.spacecraft
+        
+        if state.spacecraft_mode:
+            # The pilot flies kinematically: the ship is pinned where it is, at rest
+            nbody.set_heliocentric(ship_row, np.array(ship.pos, dtype=np.float64), np.zeros(3))
+            self.ship_piloted = True
+        elif self.ship_piloted:
+            # Released: from here the ship keeps a circular orbit
+            ship_pos = np.array([ship.pos], dtype=np.float64)
+            nbody.set_heliocentric(ship_row, ship_pos[0], NBodySystem.circular_velocities(ship_pos)[0])
+            self.ship_piloted = False
+        
+        if not state.paused:
+            nbody.step(dt * state.speed_multiplier)
+        
+        for i, p in enumerate(self.planets):
+            p.world_pos = nbody.heliocentric(i + 1).tolist()
+        if not state.spacecraft_mode:
+            ship.pos = nbody.heliocentric(ship_row).tolist()
+        if nbody.rows > ship_row + 1:
+            self.asteroid_belt.nbody_positions = nbody.heliocentric(slice(ship_row + 1, None))
+
+    def seek(self, t):
+        """Jump straight to simulation time t.
+        
+        Orbits are circular, so every planet angle, spin and asteroid angle
+        is evaluated in closed form: O(bodies) for any jump, with no float
+        drift and trails rebuilt along the orbit instead of left with gaps.
+        """
+        self.sim_time = t
+        self.stop_nbody()  # N-body restarts from the new positions
+        for p in self.planets:
+            p.seek(t)
+        self.asteroid_belt.seek(t)
+        self.update_camera()
+
+    def ephemeris(self, times):
+        """Planet positions over an array of times: name -> (len(times), 3) array."""
+        times = np.asarray(times, dtype=np.float64)
+        return {p.name: p.positions_at(times) for p in self.planets}
+
+    def interpolate(self, alpha):
+        """Place drawn bodies alpha of the way from the previous step to the last."""
+        for p in self.planets:
+            p.interpolate(alpha)
+        
+        # The belt moves uniformly, so it is drawn rewound by the unplayed part of the step
+        if state.paused or self.asteroid_belt.nbody_positions is not None:
+            self.asteroid_belt.render_lag = 0.0
+        else:
+            self.asteroid_belt.render_lag = (1.0 - alpha) * sim_clock.step * state.speed_multiplier
+
+    def update_camera(self):
         target_pos = None
         if state.selected_planet_index != -1:
-            target_pos = self.planets[state.selected_planet_index].world_pos
+            target_pos = self.planets[state.selected_planet_index].render_pos
         
         # Update camera (handle spacecraft mode specially)
         if state.camera_mode == CAM_SPACECRAFT:
@@ -1744,80 +4334,129 @@ class SolarSystem:
         else:
             self.camera.update(target_pos)
 
-    def draw(self):
-        # Draw Starfield
-        self.stars.draw()
-
-        # Draw Sun with texture
-        glPushMatrix()
-        glDisable(GL_LIGHTING)
-        
-        if "Sun" in planet_textures:
-            glEnable(GL_TEXTURE_2D)
-            glBindTexture(GL_TEXTURE_2D, planet_textures["Sun"])
-            glColor3f(1.0, 1.0, 1.0)
-            
-            quadric = gluNewQuadric()
-            gluQuadricTexture(quadric, GL_TRUE)
-            gluQuadricNormals(quadric, GLU_SMOOTH)
-            gluSphere(quadric, 2.0, 32, 32)
-            gluDeleteQuadric(quadric)
-            
-            glDisable(GL_TEXTURE_2D)
+    def cull(self):
+        """Decide which bodies the camera can see (frustum, and not behind the Sun)."""
+        centers = [(0.0, 0.0, 0.0)] + [p.render_pos for p in self.planets] + [self.spacecraft.pos]
+        radii = [2.0] + [p.bound_radius for p in self.planets] + [1.0]
+        if state.culling_enabled:
+            visible = self.camera.visible(centers, radii) & ~self.camera.occluded(centers, radii)
         else:
-            glColor3f(1.0, 1.0, 0.0)
-            gluSphere(gluNewQuadric(), 2.0, 32, 32)
+            visible = np.ones(len(centers), dtype=bool)
+        self.body_visible = visible.tolist()
         
-        if state.lighting_enabled: glEnable(GL_LIGHTING)
-        glPopMatrix()
+        # Count only what would otherwise be drawn
+        candidates = [True] + [not state.planets_hidden] * len(self.planets) + [state.camera_mode != CAM_SPACECRAFT]
+        self.cull_counts["bodies"] = [sum(v and c for v, c in zip(self.body_visible, candidates)), sum(candidates)]
+
+    def draw(self):
+        with profiler.scope("cull"):
+            self.cull()
+        visible = self.body_visible
+        mesh_cache.vertices = 0
+        shaders.begin_frame()
+        queue = self.render_queue
+        queue.begin(self.camera.eye)
         
-        # Draw Sun label
-        self._draw_sun_label()
+        # Starfield
+        queue.submit(PASS_OPAQUE, self.stars.draw, "draw.stars", program=shaders.program_id("stars"))
+
+        # Sun with texture
+        if visible[0]:
+            self.submit_sun(queue)
         
-        # Draw Asteroid Belt
-        self.asteroid_belt.draw()
+        # Asteroid Belt
+        self.asteroid_belt.submit(queue, self.camera, state.culling_enabled)
+        self.cull_counts["belt chunks"] = self.asteroid_belt.chunk_counts
         
-        # Draw Spacecraft (only visible from non-spacecraft cameras)
-        if state.camera_mode != CAM_SPACECRAFT:
-            self.spacecraft.draw()
+        # Spacecraft (only visible from non-spacecraft cameras)
+        if state.camera_mode != CAM_SPACECRAFT and visible[-1]:
+            queue.submit(PASS_OPAQUE, self.spacecraft.draw, "draw.spacecraft", at=self.spacecraft.pos)
         
-        # Draw Planets
+        # Planets
         for i, p in enumerate(self.planets):
-            p.draw(i == state.selected_planet_index)
-    
-    def _draw_sun_label(self):
-        """Draw 'Sun' label above the sun."""
-        label_y_offset = 3.0  # Above sun (radius is 2.0)
+            p.submit(queue, i == state.selected_planet_index, visible[i + 1])
         
-        glDisable(GL_LIGHTING)
-        glDisable(GL_DEPTH_TEST)
-        glColor3f(1.0, 1.0, 0.7)  # Slightly yellow-white
+        # Name labels over everything
+        queue.submit(PASS_OVERLAY, self.draw_labels, "draw.labels")
         
-        glPushMatrix()
-        glTranslatef(0.0, label_y_offset, 0.0)
+        queue.flush()
+        self.vertex_counts = {"spheres": mesh_cache.vertices, "belt": self.asteroid_belt.vertices}
+    
+    def submit_sun(self, queue):
+        pixel_radius = self.camera.projected_radius((0.0, 0.0, 0.0), 2.0)
+        mesh = self.sun_lod.select(pixel_radius)
+        texture_id = lod_texture("Sun", pixel_radius)
+        if mesh is None:
+            queue.submit(PASS_ORDERED, lambda: draw_point_sprite((1.0, 1.0, 0.0), pixel_radius), "draw.Sun")
+        else:
+            queue.submit(PASS_OPAQUE, lambda: self.draw_sun(mesh, texture_id), "draw.Sun",
+                         program=shaders.program_id("sun"), texture=texture_id or 0, at=(0.0, 0.0, 0.0))
+    
+    def draw_sun(self, mesh, texture_id):
+        """Draw the Sun at mesh (slices, stacks), textured unless texture_id is None."""
+        gl_state.disable(GL_LIGHTING)
+        if shaders.active:
+            with shaders.program("sun") as program:
+                program.set("u_textured", 0.0 if texture_id is None else 1.0)
+                if texture_id is not None:
+                    gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+                glColor3f(*((1.0, 1.0, 1.0) if texture_id is not None else (1.0, 1.0, 0.0)))
+                mesh_cache.draw_sphere(2.0, *mesh)
+        elif texture_id is not None:
+            gl_state.enable(GL_TEXTURE_2D)
+            gl_state.bind_texture(GL_TEXTURE_2D, texture_id)
+            glColor3f(1.0, 1.0, 1.0)
+            mesh_cache.draw_sphere(2.0, *mesh)
+            gl_state.disable(GL_TEXTURE_2D)
+        else:
+            glColor3f(1.0, 1.0, 0.0)
+            mesh_cache.draw_sphere(2.0, *mesh)
+    
+    def cull_report(self):
+        """Lines like "bodies: 6/10 drawn" and vertex counts for the profiler overlay."""
+        lines = [f"{name}: {drawn}/{total} drawn" for name, (drawn, total) in self.cull_counts.items()]
+        return lines + [f"{name} vertices: {count}" for name, count in self.vertex_counts.items()]
+
+    def draw_labels(self):
+        """Draw all body name labels as camera-facing text in one pass.
         
-        # Billboard - face the camera
-        modelview = glGetFloatv(GL_MODELVIEW_MATRIX)
-        for i in range(3):
-            for j in range(3):
-                if i == j:
-                    modelview[i][j] = 1.0
-                else:
-                    modelview[i][j] = 0.0
-        glLoadMatrixf(modelview)
+        The billboard transform is each label's eye-space position with an
+        identity rotation. Eye-space positions come from the camera's
+        look-at basis, computed once per frame, so no modelview readback
+        is needed.
+        """
+        labels = [((0.0, 3.0, 0.0), "Sun", (1.0, 1.0, 0.7), 0.005)]  # Above sun (radius is 2.0)
+        if not state.planets_hidden:
+            for p in self.planets:
+                pos = (p.render_pos[0], p.render_pos[1] + p.radius + 0.5, p.render_pos[2])
+                labels.append((pos, p.name, (1.0, 1.0, 1.0), 0.004))
         
-        # Scale text
-        glScalef(0.005, 0.005, 0.005)
+        total = len(labels)
+        if state.culling_enabled:
+            # A label goes with its body, and only if the text can reach the screen
+            # (stroke glyphs are about 100 units per character before scaling)
+            radii = [scale * 100.0 * len(text) for _, text, _, scale in labels]
+            on_screen = self.camera.visible([pos for pos, _, _, _ in labels], radii)
+            labels = [label for label, body, shown in zip(labels, self.body_visible, on_screen)
+                      if body and shown]
+        self.cull_counts["labels"] = [len(labels), total]
+        if not labels:
+            return
         
-        # Draw "Sun"
-        for char in "Sun":
-            glutStrokeCharacter(GLUT_STROKE_ROMAN, ord(char))
+        eye_positions = self.camera.to_eye([pos for pos, _, _, _ in labels])
         
+        gl_state.disable(GL_LIGHTING)
+        gl_state.disable(GL_DEPTH_TEST)  # Labels always visible
+        glPushMatrix()
+        for eye_pos, (_, text, color, scale) in zip(eye_positions.tolist(), labels):
+            glLoadIdentity()
+            glTranslatef(*eye_pos)
+            glScalef(scale, scale, scale)
+            glColor3f(*color)
+            glyph_cache.draw("stroke", text)
         glPopMatrix()
         
-        glEnable(GL_DEPTH_TEST)
-        if state.lighting_enabled:
-            glEnable(GL_LIGHTING)
+        gl_state.enable(GL_DEPTH_TEST)
     
     def _update_spacecraft_camera(self):
         """Position camera behind spacecraft looking in its direction."""
@@ -1845,22 +4484,26 @@ class SolarSystem:
         self.camera.up = [0.0, 1.0, 0.0]
 
     def draw_ui(self):
+        # All HUD text is queued and drawn in one overlay pass at the end
+        hud = TextBatch()
+        
         # Top-left info
         info = [f"Mode: {CAM_MODE_NAMES[state.camera_mode]}",
                 f"Speed: {state.speed_multiplier:.1f}x {'(PAUSED)' if state.paused else ''}",
-                f"Gravity: {'ON' if state.gravity_enabled else 'OFF'}",
+                f"Time: {self.sim_time / EARTH_YEAR:.2f} years",
+                f"Gravity: {'N-BODY' if state.nbody_enabled else 'ON' if state.gravity_enabled else 'OFF'}",
                 f"Lighting: {'ON' if state.lighting_enabled else 'OFF'}"]
         
         y = WINDOW_HEIGHT - 20
         for line in info:
-            draw_text(10, y, line)
+            hud.add(10, y, line)
             y -= 20
         
         # Controls hint at bottom left
-        draw_text(10, 100, "Keys: 0=Sun, 1-8=Planets, C=Camera, 9=Spacecraft")
-        draw_text(10, 80, "Spacecraft: WASD=Move, QE=Up/Down")
-        draw_text(10, 60, "Zoom: Z=In, X=Out (or Mouse Scroll)")
-        draw_text(10, 40, "Space=Pause, +/-=Speed, ESC=Exit")
+        hud.add(10, 100, "Keys: 0=Sun, 1-8=Planets, C=Camera, 9=Spacecraft")
+        hud.add(10, 80, "Spacecraft: WASD=Move, QE=Up/Down")
+        hud.add(10, 60, "Zoom: Z=In, X=Out (or Mouse Scroll)")
+        hud.add(10, 40, "Space=Pause, +/-=Speed, ESC=Exit")
             
         # Selected Celestial Body Info Panel (right side)
         selected_name = None
@@ -1879,55 +4522,58 @@ class SolarSystem:
             panel_y = WINDOW_HEIGHT - 30
             
             # Title
-            draw_text(panel_x, panel_y, f"== {selected_name} ==")
+            hud.add(panel_x, panel_y, f"== {selected_name} ==")
             panel_y -= 25
             
             # Type
-            draw_text(panel_x, panel_y, f"Type: {info_data['type']}")
+            hud.add(panel_x, panel_y, f"Type: {info_data['type']}")
             panel_y -= 18
             
             # Diameter
-            draw_text(panel_x, panel_y, f"Diameter: {info_data['diameter']}")
+            hud.add(panel_x, panel_y, f"Diameter: {info_data['diameter']}")
             panel_y -= 18
             
             # Sun-specific or Planet-specific info
             if selected_name == "Sun":
-                draw_text(panel_x, panel_y, f"Mass: {info_data['mass']}")
+                hud.add(panel_x, panel_y, f"Mass: {info_data['mass']}")
                 panel_y -= 18
-                draw_text(panel_x, panel_y, f"Surface: {info_data['surface_temp']}")
+                hud.add(panel_x, panel_y, f"Surface: {info_data['surface_temp']}")
                 panel_y -= 18
             else:
-                draw_text(panel_x, panel_y, f"Orbit: {info_data['orbit_period']}")
+                hud.add(panel_x, panel_y, f"Orbit: {info_data['orbit_period']}")
                 panel_y -= 18
-                draw_text(panel_x, panel_y, f"Distance: {info_data['distance']}")
+                hud.add(panel_x, panel_y, f"Distance: {info_data['distance']}")
                 panel_y -= 18
                 
                 # Current simulation distance
                 p = self.planets[state.selected_planet_index]
                 dist = math.sqrt(p.world_pos[0]**2 + p.world_pos[1]**2 + p.world_pos[2]**2)
-                draw_text(panel_x, panel_y, f"Sim Dist: {dist:.1f} units")
+                hud.add(panel_x, panel_y, f"Sim Dist: {dist:.1f} units")
                 panel_y -= 18
             
             # Fun Facts
             panel_y -= 10  # Extra spacing
-            draw_text(panel_x, panel_y, "--- Fun Facts ---")
+            hud.add(panel_x, panel_y, "--- Fun Facts ---")
             panel_y -= 20
             
             for fact in info_data['facts']:
-                draw_text(panel_x, panel_y, f"* {fact}")
+                hud.add(panel_x, panel_y, f"* {fact}")
                 panel_y -= 16
+        
+        hud.flush()
 
 # -----------------------------------------------------------------------------
 # Global State
 # -----------------------------------------------------------------------------
 solar_system = None
+texture_streamer = None  # Background texture loader (None when preloaded)
+sim_clock = SimulationClock()
 
 # -----------------------------------------------------------------------------
 # GLUT Callbacks
 # -----------------------------------------------------------------------------
-def display():
-    global current_screen
-    
+def render_frame():
+    gl_state.begin_frame()
     # Draw the appropriate screen
     if current_screen == SCREEN_HOME:
         draw_home_screen()
@@ -1945,7 +4591,10 @@ def display():
             
             solar_system.camera.apply()
             solar_system.draw()
-            solar_system.draw_ui()
+            with profiler.scope("draw.ui", gpu=True):
+                solar_system.draw_ui()
+            if profiler.visible:
+                profiler.draw_overlay(solar_system.cull_report() + gl_state.report())
     elif current_screen == SCREEN_TOUR:
         # Tour mode - render simulation with tour UI overlay
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -1957,33 +4606,67 @@ def display():
             solar_system.draw()
             
             # Draw tour narration overlay
-            draw_tour_ui()
-    
-    glutSwapBuffers()
+            with profiler.scope("draw.ui", gpu=True):
+                draw_tour_ui()
+            if profiler.visible:
+                profiler.draw_overlay(solar_system.cull_report() + gl_state.report())
 
-def timer(value):
-    global menu_starfield
+def advance_simulation(frame_dt=None):
+    """Run the fixed steps due after frame_dt seconds (default: wall clock).
+    
+    Physics only ever sees SIM_TIMESTEP; the leftover fraction of a step
+    positions the bodies for drawing before the camera is aimed.
+    """
+    steps = sim_clock.tick() if frame_dt is None else sim_clock.advance(frame_dt)
+    step = sim_clock.step
     
     # Only update simulation when in simulation screen
     if current_screen == SCREEN_SIMULATION and solar_system:
-        solar_system.update()
+        for _ in range(steps):
+            solar_system.step(step)
+        solar_system.interpolate(sim_clock.alpha)
+        solar_system.update_camera()
     elif current_screen == SCREEN_TOUR and solar_system:
         # Update simulation and tour during tour mode
-        solar_system.update()
-        update_tour(0.016)
+        for _ in range(steps):
+            solar_system.step(step)
+            update_tour(step)
+            if not tour_active:
+                return
+        solar_system.interpolate(sim_clock.alpha)
+        aim_tour_camera()
     elif menu_starfield:
         # Keep starfield twinkling on menu screens
-        menu_starfield.update(0.016)
+        for _ in range(steps):
+            menu_starfield.update(step)
+
+def display():
+    with profiler.scope("render"):
+        render_frame()
+    with profiler.scope("swap"):
+        glutSwapBuffers()
+    profiler.end_frame()
+
+def timer(value):
+    global menu_starfield
+    
+    # Swap in any background-generated textures
+    if texture_streamer and not texture_streamer.done:
+        with profiler.scope("textures"):
+            texture_streamer.poll(texture_priority())
+    
+    advance_simulation()
     
     glutPostRedisplay()
     glutTimerFunc(16, timer, 0)
 
 def reshape(w, h):
     if h == 0: h = 1
+    viewport_size[0], viewport_size[1] = w, h
     glViewport(0, 0, w, h)
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(45, w / h, 0.1, 300.0)
+    gluPerspective(CAMERA_FOV, w / h, CAMERA_NEAR, CAMERA_FAR)
     glMatrixMode(GL_MODELVIEW)
 
 def keyboard(key, x, y):
@@ -2056,8 +4739,17 @@ def keyboard(key, x, y):
     elif k == 'o': state.toggle_orbits()
     elif k == 'l': state.toggle_lighting()
     elif k == 'g': state.toggle_gravity()
+    elif k == 'n': state.toggle_nbody()
     elif k == 'h': state.toggle_hide()
+    elif k == 'u': state.toggle_culling()
     elif k == 'f': state.fast_forward()
+    elif k == 'p': profiler.toggle()
+    elif k == 'k': profiler.export()
+    elif k in '[]' and solar_system:
+        # Scrub the timeline one Earth year back / forward
+        step = EARTH_YEAR if k == ']' else -EARTH_YEAR
+        solar_system.seek(max(0.0, solar_system.sim_time + step))
+        print(f"Time: {solar_system.sim_time / EARTH_YEAR:.2f} years")
     elif k in '12345678': state.select_planet(int(k) - 1)
     elif k == '0': state.select_sun()  # Select Sun to show its info
     elif k == '9': state.toggle_spacecraft_mode()  # Toggle spacecraft
@@ -2108,13 +4800,13 @@ def special_keyboard(key, x, y):
 
 def init():
     glClearColor(0.05, 0.05, 0.05, 1.0) # Very Dark Grey (Space)
-    glEnable(GL_DEPTH_TEST)
+    gl_state.enable(GL_DEPTH_TEST)
     
     # Lighting Setup
-    glEnable(GL_LIGHTING)
-    glEnable(GL_LIGHT0)
-    glEnable(GL_COLOR_MATERIAL)
-    glEnable(GL_NORMALIZE) # Important for scaling
+    gl_state.enable(GL_LIGHTING)
+    gl_state.enable(GL_LIGHT0)
+    gl_state.enable(GL_COLOR_MATERIAL)
+    gl_state.enable(GL_NORMALIZE) # Important for scaling
     
     glColorMaterial(GL_FRONT, GL_AMBIENT_AND_DIFFUSE)
     
@@ -2123,36 +4815,525 @@ def init():
     glLightfv(GL_LIGHT0, GL_DIFFUSE,  [1.0, 1.0, 1.0, 1.0])
     glLightfv(GL_LIGHT0, GL_SPECULAR, [1.0, 1.0, 1.0, 1.0])
     
-    glEnable(GL_LINE_SMOOTH)
+    gl_state.enable(GL_LINE_SMOOTH)
     glHint(GL_LINE_SMOOTH_HINT, GL_NICEST)
+    
+    # Tessellate shared sphere meshes once
+    mesh_cache.build()
+    shaders.init()
+    geometry_registry.get("scanlines", (WINDOW_WIDTH, WINDOW_HEIGHT), scanline_geometry)
 
 # -----------------------------------------------------------------------------
-# Main
+# Headless Rendering
 # -----------------------------------------------------------------------------
-def main():
-    global solar_system
-    glutInit(sys.argv)
-    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
-    glutInitWindowSize(WINDOW_WIDTH, WINDOW_HEIGHT)
-    glutCreateWindow(WINDOW_TITLE)
+def create_headless_context(width, height):
+    """Make an offscreen EGL pbuffer context current (no window system needed)."""
+    from OpenGL import EGL
+    
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("Could not initialise an EGL display")
+    
+    config_attribs = [
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE,
+    ]
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    EGL.eglChooseConfig(display, (EGL.EGLint * len(config_attribs))(*config_attribs),
+                        ctypes.pointer(config), 1, ctypes.pointer(count))
+    if count.value == 0:
+        raise RuntimeError("No EGL config supports desktop OpenGL pbuffers")
+    
+    surface_attribs = [EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE]
+    surface = EGL.eglCreatePbufferSurface(display, config,
+                                          (EGL.EGLint * len(surface_attribs))(*surface_attribs))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("Could not make the EGL context current")
+
+def read_frame(width, height):
+    """Read the back buffer as a top-down (height, width, 3) uint8 array."""
+    glPixelStorei(GL_PACK_ALIGNMENT, 1)
+    data = glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE)
+    return np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)[::-1]
+
+def write_png(path, pixels):
+    """Write an (height, width, 3) uint8 array as an 8-bit RGB PNG."""
+    height, width, _ = pixels.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # Filter byte 0 per row
+    rows[:, 1:] = pixels.reshape(height, -1)
+    
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff))
+    
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+class FrameWriter:
+    """Writes captured frames to disk on a background thread.
+    
+    submit() hands a frame to a bounded queue, so PNG encoding overlaps the
+    rendering of the next frames and only blocks the renderer if the writer
+    falls FRAME_QUEUE_SIZE frames behind. "raw" frames are the bare top-down
+    RGB24 bytes.
+    """
+    def __init__(self, directory, fmt="png", queue_size=FRAME_QUEUE_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fmt = fmt
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+        self.thread.start()
+    
+    def submit(self, index, pixels):
+        if self.error:
+            raise self.error
+        self.queue.put((index, pixels))
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            index, pixels = item
+            if self.error:
+                continue  # Drain so submit() never blocks after a failure
+            path = os.path.join(self.directory, f"frame_{index:06d}.{self.fmt}")
+            try:
+                if self.fmt == "png":
+                    write_png(path, pixels)
+                else:
+                    with open(path, "wb") as f:
+                        f.write(pixels.tobytes())
+            except OSError as e:
+                self.error = e
+    
+    def close(self):
+        """Wait for queued frames to be written."""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+def run_headless(args):
+    """Render a fixed-timestep flythrough offscreen and save every frame.
+    
+    Each frame advances the simulation clock by exactly 1/fps seconds, so
+    output is independent of how long rendering takes and runs as fast as
+    the GPU and frame writer allow.
+    """
+    global solar_system, texture_streamer
+    width, height = WINDOW_WIDTH, WINDOW_HEIGHT
+    create_headless_context(width, height)
+    glyph_cache.glut = False
+    glyph_cache.enabled = not args.no_text
     init()
+    reshape(width, height)
     
-    # Show loading screen before texture generation
+    init_planet_textures(args.texture_workers)
+    # Higher LOD tiers are loaded synchronously per frame (see below)
+    texture_streamer = TextureStreamer(specs=(), workers=args.texture_workers)
+    
+    solar_system = SolarSystem(asteroid_count=args.asteroids, star_count=args.stars, seed=args.seed,
+                               asteroid_mass=args.asteroid_mass, physics_workers=args.physics_workers)
+    solar_system.bake_geometry()
+    
+    if args.tour:
+        start_tour()
+        frame_count = args.frames  # None = until the tour ends
+    else:
+        start_simulation()
+        frame_count = args.frames if args.frames is not None else HEADLESS_FRAMES
+    
+    dt = 1.0 / args.fps
+    writer = FrameWriter(args.output, args.frame_format)
+    print(f"Rendering {width}x{height} frames to {args.output}/ at {args.fps:g} frames per simulated second...")
+    start = get_time()
+    frame = 0
+    try:
+        while frame_count is None or frame < frame_count:
+            advance_simulation(dt)
+            if args.tour and not tour_active:
+                break
+            
+            with profiler.scope("render"):
+                render_frame()
+            if not texture_streamer.done:
+                # A close-up asked for a sharper tier: load it and redraw
+                texture_streamer.finish()
+                render_frame()
+            
+            with profiler.scope("readback"):
+                writer.submit(frame, read_frame(width, height))
+            profiler.end_frame()
+            frame += 1
+    finally:
+        writer.close()
+    
+    elapsed = get_time() - start
+    print(f"Wrote {frame} frames in {elapsed:.1f}s ({frame / max(elapsed, 1e-9):.1f} fps)")
+
+# -----------------------------------------------------------------------------
+# Benchmarks
+# -----------------------------------------------------------------------------
+# Named scenarios. Scene options: asteroids, stars, trail_length, seek (start
+# at this simulation time, e.g. so trails are full), tour (play the guided
+# tour instead of the free view), frames (None = until the tour ends) and
+# fps. texture_size instead times generating every body's texture at that size.
+BENCHMARK_SCENARIOS = {
+    "default": {},
+    "belt_10k": {"asteroids": 10000},
+    "belt_100k": {"asteroids": 100000},
+    "stars_100k": {"stars": 100000},
+    "long_trails": {"trail_length": 5000, "seek": 300.0},
+    "tour": {"tour": True, "frames": None, "fps": 10},
+    "textures_128": {"texture_size": 128},
+    "textures_512": {"texture_size": 512},
+    "textures_2048": {"texture_size": 2048},
+}
+
+# Metric -> True if larger is better
+BENCHMARK_METRICS = {
+    "startup_s": False,
+    "steps_per_s": True,
+    "frame_ms_mean": False,
+    "frame_ms_p50": False,
+    "frame_ms_p95": False,
+    "frame_ms_p99": False,
+    "draw_calls": False,
+    "vertices": False,
+    "state_calls": False,
+    "texture_s": False,
+}
+# Tail latencies come from a handful of samples per run, so they are
+# reported but never fail the comparison
+BENCHMARK_REPORT_ONLY = {"frame_ms_p95", "frame_ms_p99"}
+
+class DrawCallCounter:
+    """Counts draw calls issued by this module while active.
+    
+    The module uses GL through `from OpenGL.GL import *`, so swapping the
+    draw entry points in its globals catches every caller.
+    """
+    FUNCTIONS = ("glDrawArrays", "glDrawElements", "glCallList", "glCallLists", "glBegin")
+    
+    def __init__(self):
+        self.count = 0
+        self.originals = {}
+    
+    def _wrap(self, fn):
+        def counted(*args):
+            self.count += 1
+            return fn(*args)
+        return counted
+    
+    def __enter__(self):
+        module = globals()
+        for name in self.FUNCTIONS:
+            self.originals[name] = module[name]
+            module[name] = self._wrap(module[name])
+        return self
+    
+    def __exit__(self, *exc):
+        globals().update(self.originals)
+        self.originals = {}
+    
+    def take(self):
+        """Calls since the last take()."""
+        count, self.count = self.count, 0
+        return count
+
+def benchmark_textures(size):
+    """Seconds to generate every texture at size on this thread (no cache)."""
+    specs = [tier_spec(name, size) for name, kind, _, _ in TEXTURE_SPECS if kind != "asteroid"]
+    start = time.perf_counter()
+    for spec in specs:
+        texture_pixels(*spec)
+    elapsed = time.perf_counter() - start
+    return {"texture_s": elapsed, "textures": len(specs)}
+
+def benchmark_scene(options, seed):
+    """Build a scene, time physics steps and rendered frames."""
+    global solar_system
+    state.__init__()
+    sim_clock.__init__()
+    frames = options.get("frames", BENCHMARK_FRAMES)
+    dt = 1.0 / options.get("fps", HEADLESS_FPS)
+    
+    start = time.perf_counter()
+    solar_system = SolarSystem(asteroid_count=options.get("asteroids", ASTEROID_COUNT),
+                               star_count=options.get("stars", STAR_COUNT), seed=seed,
+                               trail_length=options.get("trail_length", TRAIL_LENGTH))
+    solar_system.bake_geometry()
+    if "seek" in options:
+        solar_system.seek(options["seek"])
+    start_tour() if options.get("tour") else start_simulation()
+    advance_simulation(dt)
+    render_frame()
+    glFinish()
+    startup = time.perf_counter() - start
+    
+    # Warm up caches and the driver on the first frame, without moving the scene on
+    for _ in range(BENCHMARK_WARMUP_FRAMES):
+        render_frame()
+    glFinish()
+    
+    # Physics alone; restored afterwards so every run renders the same frames
+    if not options.get("tour"):
+        saved_time = solar_system.sim_time
+        start = time.perf_counter()
+        for _ in range(BENCHMARK_STEPS):
+            solar_system.step(SIM_TIMESTEP)
+        steps_per_s = BENCHMARK_STEPS / (time.perf_counter() - start)
+        solar_system.seek(saved_time)
+    else:
+        steps_per_s = None
+    
+    frame_ms = []
+    draw_calls = []
+    drawn = collections.defaultdict(list)  # Culling category -> drawn per frame
+    vertices = []
+    state_calls = []  # GL state changes issued (after gl_state's elision)
+    with DrawCallCounter() as counter:
+        while frames is None or len(frame_ms) < frames:
+            if not texture_streamer.done:
+                texture_streamer.finish()  # Close-up tiers load outside the timing
+            start = time.perf_counter()
+            advance_simulation(dt)
+            if options.get("tour") and not tour_active:
+                break
+            render_frame()
+            glFinish()
+            frame_ms.append((time.perf_counter() - start) * 1000.0)
+            draw_calls.append(counter.take())
+            vertices.append(sum(solar_system.vertex_counts.values()))
+            state_calls.append(gl_state.issued)
+            for name, (count, total) in solar_system.cull_counts.items():
+                drawn[name].append(count / total if total else 1.0)
+    solar_system.close()
+    
+    result = {
+        "startup_s": startup,
+        "frames": len(frame_ms),
+        "frame_ms_mean": float(np.mean(frame_ms)),
+        "draw_calls": float(np.mean(draw_calls)),
+        "vertices": float(np.mean(vertices)),
+        "state_calls": float(np.mean(state_calls)),
+    }
+    for name, fractions in drawn.items():
+        result[f"drawn_{name.replace(' ', '_')}"] = float(np.mean(fractions))  # Share not culled
+    for q, value in zip((50, 95, 99), np.percentile(frame_ms, (50, 95, 99))):
+        result[f"frame_ms_p{q}"] = float(value)
+    if steps_per_s is not None:
+        result["steps_per_s"] = steps_per_s
+    return result
+
+def compare_benchmarks(results, baseline, tolerance=BENCHMARK_TOLERANCE):
+    """Print each metric against the baseline; return the regressions as strings."""
+    regressions = []
+    for name, metrics in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            print(f"{name}: no baseline")
+            continue
+        for metric, higher_is_better in BENCHMARK_METRICS.items():
+            if metric not in metrics or not base.get(metric):
+                continue
+            value, ref = metrics[metric], base[metric]
+            change = value / ref - 1.0
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "worse (not gated)" if metric in BENCHMARK_REPORT_ONLY else "REGRESSION"
+            print(f"  {name:<14}{metric:<15}{ref:12.3f} -> {value:12.3f} ({change:+.1%}) {flag}")
+            if flag == "REGRESSION":
+                regressions.append(f"{name}.{metric} {change:+.1%}")
+    return regressions
+
+def run_benchmarks(args):
+    """Run the benchmark scenarios headless; returns a process exit code.
+    
+    Each scenario runs args.benchmark_runs times and every metric is the
+    median over the runs. Results go to args.benchmark_output as JSON. If
+    the baseline file exists they are compared with it and any gated
+    metric worse than the tolerance fails the run; otherwise the results
+    become the baseline.
+    """
+    global texture_streamer
+    names = args.benchmark or list(BENCHMARK_SCENARIOS)
+    unknown = [name for name in names if name not in BENCHMARK_SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(BENCHMARK_SCENARIOS)})")
+        return 2
+    seed = args.seed if args.seed is not None else 0
+    
+    width, height = WINDOW_WIDTH, WINDOW_HEIGHT
+    create_headless_context(width, height)
+    glyph_cache.glut = False
+    glyph_cache.enabled = False  # Baselines were recorded without text
+    init()
+    reshape(width, height)
+    init_planet_textures(args.texture_workers)
+    texture_streamer = TextureStreamer(specs=(), workers=args.texture_workers)
+    
+    results = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "renderer": glGetString(GL_RENDERER).decode(errors="replace"),
+            "shaders": shaders.active,
+            "seed": seed,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    for name in names:
+        options = BENCHMARK_SCENARIOS[name]
+        print(f"Benchmark {name}...")
+        runs = []
+        for _ in range(max(args.benchmark_runs, 1)):
+            if "texture_size" in options:
+                runs.append(benchmark_textures(options["texture_size"]))
+            else:
+                runs.append(benchmark_scene(options, seed))
+        metrics = {key: float(np.median([run[key] for run in runs])) if isinstance(runs[0][key], float)
+                   else runs[0][key] for key in runs[0]}
+        results["scenarios"][name] = metrics
+        print("  " + ", ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                               for k, v in metrics.items()))
+    
+    with open(args.benchmark_output, "w") as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {args.benchmark_output}")
+    
+    if not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"No baseline yet: saved these results as {args.baseline}")
+        return 0
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"Compared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+    regressions = compare_benchmarks(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("No regressions")
+    return 0
+
+# -----------------------------------------------------------------------------
+# Main
+# -----------------------------------------------------------------------------
+def parse_args(argv):
+    """Parse our command-line options; anything unrecognised is left for GLUT."""
+    parser = argparse.ArgumentParser(description="Solar System Simulation")
+    parser.add_argument("--texture-workers", type=int, default=TEXTURE_WORKERS, metavar="N",
+                        help="generate textures in N worker processes (0 = one background thread)")
+    parser.add_argument("--preload-textures", action="store_true",
+                        help="generate every texture behind a loading screen before starting")
+    parser.add_argument("--asteroids", type=int, default=ASTEROID_COUNT, metavar="N",
+                        help="number of rocks in the asteroid belt")
+    parser.add_argument("--stars", type=int, default=STAR_COUNT, metavar="N",
+                        help="number of background stars")
+    parser.add_argument("--asteroid-mass", type=float, default=NBODY_ASTEROID_MASS, metavar="M",
+                        help="N-body mode: mass of each rock in solar masses (> 0 makes the belt self-gravitating)")
+    parser.add_argument("--physics-workers", type=int, default=PHYSICS_WORKERS, metavar="N",
+                        help="N-body mode: step the asteroid belt in N worker processes (0 = main thread only)")
+    parser.add_argument("--benchmark-gravity", action="store_true",
+                        help="compare the Barnes-Hut solver with direct summation and exit")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, metavar="N",
+                        help="seed the scene layout so runs are reproducible")
+    parser.add_argument("--benchmark", nargs="*", default=None, metavar="SCENARIO",
+                        help=f"run benchmark scenarios headless (default all: {', '.join(BENCHMARK_SCENARIOS)}) and exit")
+    parser.add_argument("--benchmark-output", default="benchmark_results.json", metavar="FILE",
+                        help="benchmark: where to write the JSON results")
+    parser.add_argument("--benchmark-runs", type=int, default=BENCHMARK_RUNS, metavar="N",
+                        help="benchmark: runs per scenario (metrics are the median over runs)")
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE, metavar="FILE",
+                        help="benchmark: results to compare against (created if missing)")
+    parser.add_argument("--tolerance", type=float, default=BENCHMARK_TOLERANCE, metavar="FRACTION",
+                        help="benchmark: allowed regression per metric, e.g. 0.15 for 15%%")
+    parser.add_argument("--fixed-function", action="store_true",
+                        help="draw with the fixed-function pipeline even if GLSL shaders are available")
+    parser.add_argument("--profile-output", default=None, metavar="FILE",
+                        help="save frame-time profiler samples to FILE (.csv or .json) on exit")
+    parser.add_argument("--headless", action="store_true",
+                        help="render offscreen (EGL) and save frames instead of opening a window")
+    parser.add_argument("--tour", action="store_true",
+                        help="headless: render the guided tour instead of the free simulation")
+    parser.add_argument("--frames", type=int, default=None, metavar="N",
+                        help=f"headless: number of frames (default: whole tour, or {HEADLESS_FRAMES})")
+    parser.add_argument("--fps", type=float, default=HEADLESS_FPS,
+                        help="headless: output frames per simulated second")
+    parser.add_argument("--output", default="frames", metavar="DIR",
+                        help="headless: directory for the frame sequence")
+    parser.add_argument("--frame-format", choices=("png", "raw"), default="png",
+                        help="headless: PNG files or raw RGB24 dumps")
+    parser.add_argument("--no-text", action="store_true",
+                        help="headless: leave out planet labels, the HUD and tour narration")
+    return parser.parse_known_args(argv[1:])
+
+def show_loading_screen():
+    """Draw a single "Loading..." frame while textures are generated up front."""
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
     gluOrtho2D(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT)
     glMatrixMode(GL_MODELVIEW)
     glLoadIdentity()
-    glDisable(GL_LIGHTING)
+    gl_state.disable(GL_LIGHTING)
     glColor3f(0.6, 0.8, 1.0)
     glRasterPos2i(WINDOW_WIDTH // 2 - 80, WINDOW_HEIGHT // 2)
     for char in "Loading...":
         glutBitmapCharacter(GLUT_BITMAP_TIMES_ROMAN_24, ord(char))
     glutSwapBuffers()
+
+def main():
+    global solar_system, texture_streamer
+    args, glut_args = parse_args(sys.argv)
+    if args.benchmark_gravity:
+        benchmark_gravity()
+        return
+    if args.fixed_function:
+        shaders.enabled = False
+    if args.benchmark is not None:
+        sys.exit(run_benchmarks(args))
+    if args.profile_output:
+        profiler.output = args.profile_output
+        profiler.record_gpu = True
+        atexit.register(profiler.export)
+    if args.headless:
+        run_headless(args)
+        return
+    glutInit([sys.argv[0]] + glut_args)
+    glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
+    glutInitWindowSize(WINDOW_WIDTH, WINDOW_HEIGHT)
+    glutCreateWindow(WINDOW_TITLE)
+    init()
+    
+    if args.preload_textures:
+        show_loading_screen()
+        init_planet_textures(args.texture_workers)  # Generate procedural textures
+        # Still stream higher LOD tiers for close-ups on demand
+        texture_streamer = TextureStreamer(specs=(), workers=args.texture_workers)
+    else:
+        # Open straight away; bodies use flat colors until textures stream in
+        texture_streamer = TextureStreamer(workers=args.texture_workers)
     
-    init_planet_textures()  # Generate procedural textures
-    solar_system = SolarSystem()
+    solar_system = SolarSystem(asteroid_count=args.asteroids, star_count=args.stars, seed=args.seed,
+                               asteroid_mass=args.asteroid_mass, physics_workers=args.physics_workers)
+    solar_system.bake_geometry()
     glutDisplayFunc(display)
     glutReshapeFunc(reshape)
     glutKeyboardFunc(keyboard)